@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import tempfile
+import tracemalloc
+
+from capstone.src.file_utils import save_data_to_file, stream_data_to_file
+from capstone.src.generators import generate_data_lines, iter_data_chunks
+from capstone.src.record_encoder import compile_chunk_encoder
+from capstone.src.schema_plan import compile_data_schema
+
+# Compares peak Python heap usage of the list based writer with the streaming writer.
+# Usage: python -m capstone.benchmarks.bench_memory --data_lines 10000 100000 1000000
+
+BENCHMARK_SCHEMA = {
+    "id": "int:rand(1, 1000000)",
+    "name": "str:rand",
+    "type": "str:['client', 'partner', 'government']",
+    "age": "int:rand(1, 90)",
+    "created_at": "timestamp:"
+}
+
+def measure_peak_memory(write_file, file_path: str) -> int:
+    tracemalloc.start()
+    try:
+        write_file(file_path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_memory_benchmark(data_lines_values: list[int]) -> list[dict]:
+    schema_plan = compile_data_schema(BENCHMARK_SCHEMA)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'bench.json')
+
+        for data_lines in data_lines_values:
+            list_peak = measure_peak_memory(
+                lambda path: save_data_to_file(generate_data_lines(schema_plan, data_lines), path), file_path)
+            stream_peak = measure_peak_memory(
+                lambda path: stream_data_to_file(iter_data_chunks(schema_plan, data_lines), path,
+                                                 encode_chunk=compile_chunk_encoder(schema_plan, 'json')),
+                file_path)
+
+            results.append({'data_lines': data_lines,
+                            'list_peak_bytes': list_peak,
+                            'stream_peak_bytes': stream_peak})
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory benchmark for list and streaming file writers')
+    parser.add_argument('--data_lines', type=int, nargs='+', default=[10000, 100000, 500000])
+    args = parser.parse_args()
+
+    print(json.dumps(run_memory_benchmark(args.data_lines), indent=2))
+
+if __name__ == "__main__":
+    main()
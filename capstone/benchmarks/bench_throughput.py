@@ -0,0 +1,126 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+
+from capstone.src.config_loader import load_defaults_from_config
+from capstone.src.generators import generate_and_save_data, generate_data_rows
+from capstone.src.record_encoder import compile_chunk_encoder
+from capstone.src.schema_plan import compile_data_schema
+from capstone.benchmarks.bench_memory import BENCHMARK_SCHEMA
+
+# Throughput benchmark for magicgenerator, results are printed (or saved) as JSON.
+# Usage: python -m capstone.benchmarks.bench_throughput --output results.json --baseline previous.json
+
+INSTRUCTION_SCHEMAS = {
+    'str:rand': {"value": "str:rand"},
+    'int:rand': {"value": "int:rand"},
+    'int:rand(a, b)': {"value": "int:rand(1, 1000000)"},
+    'str:[list]': {"value": "str:['client', 'partner', 'government']"},
+    'int:[list]': {"value": "int:[10, 20, 30, 40, 50]"},
+    'str:constant': {"value": "str:constant value"},
+    'int:constant': {"value": "int:42"},
+    'timestamp': {"value": "timestamp:"}
+}
+
+REGRESSION_TOLERANCE = 0.1
+
+def best_of(repeat: int, benchmark, *args) -> dict:
+    # The fastest of several runs is the least affected by noise from other processes.
+    return min((benchmark(*args) for _ in range(repeat)), key=lambda result: result['seconds'])
+
+def benchmark_instruction(schema: dict, engine: str, data_lines: int) -> dict:
+    schema_plan = compile_data_schema(schema)
+    encode_chunk = compile_chunk_encoder(schema_plan, 'json')
+
+    started = time.perf_counter()
+    encoded_bytes = len(encode_chunk(generate_data_rows(schema_plan, data_lines, engine)).encode())
+    elapsed = time.perf_counter() - started
+
+    return {'records_per_sec': data_lines / elapsed,
+            'mb_per_sec': encoded_bytes / elapsed / 1024 / 1024,
+            'seconds': elapsed}
+
+def benchmark_run(defaults: dict, data_lines: int, files_count: int, multiprocessing: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        args = dict(defaults, path_to_save_files=directory, data_schema=BENCHMARK_SCHEMA, file_prefix='count',
+                    data_lines=data_lines, files_count=files_count, multiprocessing=multiprocessing, clear_path=False)
+
+        started = time.perf_counter()
+        generate_and_save_data(args)
+        elapsed = time.perf_counter() - started
+
+        written_bytes = sum(entry.stat().st_size for entry in os.scandir(directory))
+
+    return {'records_per_sec': data_lines * files_count / elapsed,
+            'mb_per_sec': written_bytes / elapsed / 1024 / 1024,
+            'seconds': elapsed}
+
+def run_benchmarks(instruction_lines: int, data_lines_values: list[int], files_count_values: list[int],
+                   multiprocessing_values: list[int], engines: list[str], repeat: int = 1) -> dict:
+    defaults = load_defaults_from_config()
+    results = {}
+
+    for name, schema in INSTRUCTION_SCHEMAS.items():
+        for engine in engines:
+            results[f"instruction {name} engine={engine}"] = best_of(repeat, benchmark_instruction,
+                                                                      schema, engine, instruction_lines)
+
+    for data_lines in data_lines_values:
+        for files_count in files_count_values:
+            for multiprocessing in multiprocessing_values:
+                key = f"run data_lines={data_lines} files_count={files_count} multiprocessing={multiprocessing}"
+                results[key] = best_of(repeat, benchmark_run, defaults, data_lines, files_count, multiprocessing)
+
+    return {'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results}
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> list[dict]:
+    regressions = []
+    for key, result in report['results'].items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        ratio = result['records_per_sec'] / previous['records_per_sec']
+        result['baseline_ratio'] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append({'benchmark': key, 'ratio': ratio})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput benchmark for magicgenerator')
+    parser.add_argument('--instruction_lines', type=int, default=100000)
+    parser.add_argument('--data_lines', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--files_count', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--multiprocessing', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--engines', nargs='+', default=['record', 'batch'])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the fastest one is reported.')
+    parser.add_argument('--output', help='Path of the JSON file to save the results to.')
+    parser.add_argument('--baseline', help='Results of a previous run to compare against.')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='Benchmarks slower than the baseline by more than this fraction are regressions.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    report = run_benchmarks(args.instruction_lines, args.data_lines, args.files_count, args.multiprocessing,
+                            args.engines, args.repeat)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare_with_baseline(report, json.load(f), args.tolerance)
+        for regression in report['regressions']:
+            logging.warning(f"Regression in '{regression['benchmark']}': {regression['ratio']:.0%} of baseline")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
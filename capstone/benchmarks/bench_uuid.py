@@ -0,0 +1,42 @@
+import argparse
+import json
+import timeit
+import uuid
+
+from capstone.src.generators import generate_value
+from capstone.src.schema_plan import compile_data_schema
+from capstone.src.uuid_strings import generate_uuid_strings
+
+# Compares the ways of generating str:rand values against one str(uuid.uuid4()) call per value,
+# which is what generate_value did before UUID strings were formatted in blocks.
+# Usage: python -m capstone.benchmarks.bench_uuid --values 100000
+
+def run_uuid_benchmark(values: int, repeat: int) -> list[dict]:
+    uuid_field = compile_data_schema({"value": "str:rand"})[0]
+    benchmarks = {
+        'uuid4 per value': lambda: [str(uuid.uuid4()) for _ in range(values)],
+        'generate_value': lambda: [generate_value("str", "rand") for _ in range(values)],
+        'schema plan field': lambda: [uuid_field.generate() for _ in range(values)],
+        'bulk column': lambda: generate_uuid_strings(values)
+    }
+
+    results = []
+    for name, benchmark in benchmarks.items():
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=repeat))
+        results.append({'benchmark': name, 'values_per_sec': values / seconds, 'seconds': seconds})
+
+    baseline = results[0]['seconds']
+    for result in results:
+        result['speedup'] = baseline / result['seconds']
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of str:rand UUID string generation')
+    parser.add_argument('--values', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark, the fastest one is reported.')
+    args = parser.parse_args()
+
+    print(json.dumps(run_uuid_benchmark(args.values, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import io
+import logging
+import sys
+import tarfile
+import time
+import zipfile
+from typing import Callable, Iterable
+
+from capstone.src.constants import (ARCHIVE_TAR, ARCHIVE_ZIP, COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_BZ2,
+                                    COMPRESSION_LZMA, COMPRESSION_EXTENSIONS)
+
+# Archive sink: every generated file becomes a member of one streamed tar or zip archive,
+# so a run creates a single inode no matter how large files_count is.
+# With an archive, --compression selects the archive's own compression.
+
+TAR_STREAM_MODES = {
+    COMPRESSION_NONE: 'w|',
+    COMPRESSION_GZIP: 'w|gz',
+    COMPRESSION_BZ2: 'w|bz2',
+    COMPRESSION_LZMA: 'w|xz'
+}
+
+ZIP_COMPRESSION_METHODS = {
+    COMPRESSION_NONE: zipfile.ZIP_STORED,
+    COMPRESSION_GZIP: zipfile.ZIP_DEFLATED,
+    COMPRESSION_BZ2: zipfile.ZIP_BZIP2,
+    COMPRESSION_LZMA: zipfile.ZIP_LZMA
+}
+
+def get_archive_extension(archive: str, compression: str = COMPRESSION_NONE) -> str:
+    if archive == ARCHIVE_ZIP or compression == COMPRESSION_NONE:
+        return archive
+    return f"{ARCHIVE_TAR}.{COMPRESSION_EXTENSIONS[compression]}"
+
+def open_archive(file_path: str, archive: str, compression: str) -> tarfile.TarFile | zipfile.ZipFile:
+    if archive == ARCHIVE_TAR:
+        return tarfile.open(file_path, TAR_STREAM_MODES[compression])
+    return zipfile.ZipFile(file_path, 'w', compression=ZIP_COMPRESSION_METHODS[compression])
+
+def add_archive_member(archive_file: tarfile.TarFile | zipfile.ZipFile, member_name: str, data: bytes) -> None:
+    if isinstance(archive_file, zipfile.ZipFile):
+        archive_file.writestr(member_name, data)
+        return
+
+    member = tarfile.TarInfo(member_name)
+    member.size = len(data)
+    member.mtime = int(time.time())
+    member.mode = 0o644
+    archive_file.addfile(member, io.BytesIO(data))
+
+def write_archive(members: Iterable[tuple[int, bytes]], name_member: Callable[[int], str], file_path: str,
+                  archive: str, compression: str = COMPRESSION_NONE) -> int:
+    members_count = 0
+    try:
+        with open_archive(file_path, archive, compression) as archive_file:
+            for index, data in members:
+                add_archive_member(archive_file, name_member(index), data)
+                members_count += 1
+        logging.info(f"Successfully saved {members_count} files to archive: {file_path}")
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        logging.error(f"Error saving archive {file_path}: {e}")
+        sys.exit(1)
+    return members_count
@@ -56,6 +56,62 @@ def validate_multiprocessing(multiprocessing: int) -> int:
 
     return multiprocessing
 
+def validate_files_per_task(files_per_task: int) -> int:
+    if files_per_task <= 0:
+        logging.error(f"files_per_task argument must be a positive number: {files_per_task}")
+        sys.exit(1)
+
+    return files_per_task
+
+def validate_metrics_file(metrics_file: str) -> str:
+    if not metrics_file:
+        return metrics_file
+
+    absolute_path = os.path.abspath(metrics_file)
+    if not os.path.isdir(os.path.dirname(absolute_path)):
+        logging.error(f"Directory for the metrics file does not exist: {os.path.dirname(absolute_path)}")
+        sys.exit(1)
+
+    if os.path.isdir(absolute_path):
+        logging.error(f"metrics_file points to a directory: {absolute_path}")
+        sys.exit(1)
+
+    return absolute_path
+
+def validate_serve_port(serve_port: int) -> int:
+    if not 0 <= serve_port <= 65535:
+        logging.error(f"serve_port must be between 0 and 65535: {serve_port}")
+        sys.exit(1)
+
+    return serve_port
+
+def validate_seed(seed: int | None) -> int | None:
+    if seed is not None and seed < 0:
+        logging.error(f"seed can't be a negative number: {seed}")
+        sys.exit(1)
+
+    return seed
+
+def validate_cache_dir(cache_dir: str) -> str:
+    if not cache_dir:
+        return cache_dir
+
+    absolute_path = os.path.abspath(cache_dir)
+    try:
+        os.makedirs(absolute_path, exist_ok=True)
+    except OSError as e:
+        logging.error(f"Failed to create cache directory {absolute_path}: {e}")
+        sys.exit(1)
+
+    return absolute_path
+
+def validate_cache_size_mb(cache_size_mb: int) -> int:
+    if cache_size_mb <= 0:
+        logging.error(f"cache_size_mb must be greater than 0: {cache_size_mb}")
+        sys.exit(1)
+
+    return cache_size_mb
+
 def validate_all_arguments(args: argparse.Namespace) -> dict:
     validated_path = validate_path_to_save_files(args.path_to_save_files)
     logging.info(f"Provided path argument: {validated_path} is valid.")
@@ -66,13 +122,37 @@ def validate_all_arguments(args: argparse.Namespace) -> dict:
     validated_data_lines = validate_data_lines(args.data_lines)
     logging.info(f"Provided data_lines argument: {validated_data_lines} is valid.")
 
-    data_schema = load_json_data_schema(args.data_schema)
-    validated_data_schema = validate_data_schema(data_schema)
-    logging.info(f"Provided data_schema argument: {validated_data_schema} is valid.")
+    validated_data_schema = None
+    if args.data_schema is not None:
+        data_schema = load_json_data_schema(args.data_schema)
+        validated_data_schema = validate_data_schema(data_schema)
+        logging.info(f"Provided data_schema argument: {validated_data_schema} is valid.")
+    elif not args.manifest and not args.serve:
+        logging.error("data_schema argument is required unless --manifest or --serve is used. "
+                      "Check --help for more information about expected value.")
+        sys.exit(1)
 
     validated_multiprocessing = validate_multiprocessing(args.multiprocessing)
     logging.info(f"Provided multiprocessing argument: {validated_multiprocessing} is valid.")
 
+    validated_files_per_task = validate_files_per_task(args.files_per_task)
+    logging.info(f"Provided files_per_task argument: {validated_files_per_task} is valid.")
+
+    validated_metrics_file = validate_metrics_file(args.metrics_file)
+    if validated_metrics_file:
+        logging.info(f"Provided metrics_file argument: {validated_metrics_file} is valid.")
+
+    validated_seed = validate_seed(args.seed)
+    if validated_seed is not None:
+        logging.info(f"Provided seed argument: {validated_seed} is valid.")
+
+    validated_cache_dir = validate_cache_dir(args.cache_dir)
+    validated_cache_size_mb = validate_cache_size_mb(args.cache_size_mb)
+    if validated_cache_dir:
+        logging.info(f"Provided cache_dir argument: {validated_cache_dir} is valid.")
+
+    validated_serve_port = validate_serve_port(args.serve_port)
+
     return {'path_to_save_files': validated_path,
             'file_name': args.file_name,
             'file_prefix': args.file_prefix,
@@ -80,5 +160,22 @@ def validate_all_arguments(args: argparse.Namespace) -> dict:
             'data_lines': validated_data_lines,
             'data_schema': validated_data_schema,
             'clear_path': args.clear_path,
-            'multiprocessing': validated_multiprocessing
+            'clear_mode': args.clear_mode,
+            'multiprocessing': validated_multiprocessing,
+            'engine': args.engine,
+            'output_format': args.output_format,
+            'compression': args.compression,
+            'archive': args.archive,
+            'files_per_task': validated_files_per_task,
+            'pipeline': args.pipeline,
+            'seed': validated_seed,
+            'cache_dir': validated_cache_dir,
+            'cache_size_mb': validated_cache_size_mb,
+            'stats': args.stats,
+            'metrics_file': validated_metrics_file,
+            'profile': args.profile,
+            'serve': args.serve,
+            'serve_host': args.serve_host,
+            'serve_port': validated_serve_port,
+            'manifest': args.manifest
             }
\ No newline at end of file
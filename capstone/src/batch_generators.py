@@ -0,0 +1,52 @@
+import time
+import random
+from typing import Any
+
+from capstone.src.constants import (FIELD_KIND_TIMESTAMP, FIELD_KIND_UUID, FIELD_KIND_RAND_INT,
+                                    FIELD_KIND_CHOICE, FIELD_KIND_FILE_CHOICE, BATCH_SIZE, BATCH_RAND_INT_MAX_SPAN)
+from capstone.src.schema_plan import CompiledField, records_from_rows
+from capstone.src.uuid_strings import generate_uuid_strings
+
+# Columnar engine: every schema field is generated as a whole block of values
+# with bulk primitives (random.choices, bulk formatted UUID strings) instead of one call per value.
+# Rows are assembled from the columns as plan ordered tuples.
+# Passing a seeded random.Random as rng makes every column except timestamps reproducible.
+
+def generate_random_int_column(lower_bound: int, upper_bound: int, size: int,
+                               rng: random.Random | None = None) -> list[int]:
+    rng = rng or random
+    if upper_bound - lower_bound >= BATCH_RAND_INT_MAX_SPAN:
+        return [rng.randint(lower_bound, upper_bound) for _ in range(size)]
+    return rng.choices(range(lower_bound, upper_bound + 1), k=size)
+
+def generate_column(field: CompiledField, size: int, rng: random.Random | None = None) -> list[Any]:
+    if field.kind == FIELD_KIND_TIMESTAMP:
+        return [time.time() for _ in range(size)]
+
+    if field.kind == FIELD_KIND_UUID:
+        return generate_uuid_strings(size, rng)
+
+    if field.kind == FIELD_KIND_RAND_INT:
+        return generate_random_int_column(*field.argument, size, rng)
+
+    if field.kind == FIELD_KIND_CHOICE:
+        return (rng or random).choices(field.argument, k=size)
+
+    if field.kind == FIELD_KIND_FILE_CHOICE:
+        return field.argument.sample(size, rng)
+
+    return [field.argument] * size
+
+def generate_columns(schema_plan: list[CompiledField], size: int, rng: random.Random | None = None) -> list[list[Any]]:
+    return [generate_column(field, size, rng) for field in schema_plan]
+
+def generate_batch_rows(schema_plan: list[CompiledField], data_lines: int,
+                        rng: random.Random | None = None) -> list[tuple]:
+    rows = []
+    for start in range(0, data_lines, BATCH_SIZE):
+        rows.extend(zip(*generate_columns(schema_plan, min(BATCH_SIZE, data_lines - start), rng)))
+    return rows
+
+def generate_data_batch(schema_plan: list[CompiledField], data_lines: int,
+                        rng: random.Random | None = None) -> list[dict]:
+    return records_from_rows(schema_plan, generate_batch_rows(schema_plan, data_lines, rng))
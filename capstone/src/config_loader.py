@@ -2,8 +2,17 @@ import logging
 import sys
 import os
 import configparser
+from functools import lru_cache
 
-def load_defaults_from_config(config_file='capstone/resources/default.ini'):
+# Resolved from this module, so the CLI works from any working directory.
+DEFAULT_CONFIG_FILE = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'resources', 'default.ini'))
+
+def load_defaults_from_config(config_file: str = DEFAULT_CONFIG_FILE) -> dict:
+    # The file is parsed once per process, every caller gets its own copy of the defaults.
+    return dict(read_defaults_from_config(os.path.abspath(config_file)))
+
+@lru_cache(maxsize=None)
+def read_defaults_from_config(config_file: str) -> dict:
     if not os.path.exists(config_file):
         logging.error(f"Required configuration file '{config_file}' not found.")
         sys.exit(1)
@@ -11,28 +20,77 @@ def load_defaults_from_config(config_file='capstone/resources/default.ini'):
     try:
         config = configparser.ConfigParser()
         config.read(config_file)
-        logging.info(f"Default configuration successfully loaded from '{config_file}'")
+        logging.debug(f"Default configuration successfully loaded from '{config_file}'")
 
         path_to_save_files = config.get('DEFAULT', 'path_to_save_files')
-        logging.info(f"Loaded path_to_save_files: {path_to_save_files}")
+        logging.debug(f"Loaded path_to_save_files: {path_to_save_files}")
 
         files_count = config.getint('DEFAULT', 'files_count')
-        logging.info(f"Loaded files_count: {files_count}")
+        logging.debug(f"Loaded files_count: {files_count}")
 
         file_name = config.get('DEFAULT', 'file_name')
-        logging.info(f"Loaded file_name: {file_name}")
+        logging.debug(f"Loaded file_name: {file_name}")
 
         file_prefix = config.get('DEFAULT', 'file_prefix')
-        logging.info(f"Loaded file_prefix: {file_prefix}")
+        logging.debug(f"Loaded file_prefix: {file_prefix}")
 
         data_lines = config.getint('DEFAULT', 'data_lines')
-        logging.info(f"Loaded data_lines: {data_lines}")
+        logging.debug(f"Loaded data_lines: {data_lines}")
 
         clear_path = config.getboolean('DEFAULT', 'clear_path')
-        logging.info(f"Loaded clear_path: {clear_path}")
+        logging.debug(f"Loaded clear_path: {clear_path}")
+
+        clear_mode = config.get('DEFAULT', 'clear_mode')
+        logging.debug(f"Loaded clear_mode: {clear_mode}")
 
         multiprocessing = config.getint('DEFAULT', 'multiprocessing')
-        logging.info(f"Loaded multiprocessing: {multiprocessing}")
+        logging.debug(f"Loaded multiprocessing: {multiprocessing}")
+
+        engine = config.get('DEFAULT', 'engine')
+        logging.debug(f"Loaded engine: {engine}")
+
+        output_format = config.get('DEFAULT', 'output_format')
+        logging.debug(f"Loaded output_format: {output_format}")
+
+        compression = config.get('DEFAULT', 'compression')
+        logging.debug(f"Loaded compression: {compression}")
+
+        archive = config.get('DEFAULT', 'archive')
+        logging.debug(f"Loaded archive: {archive}")
+
+        files_per_task = config.getint('DEFAULT', 'files_per_task')
+        logging.debug(f"Loaded files_per_task: {files_per_task}")
+
+        pipeline = config.getboolean('DEFAULT', 'pipeline')
+        logging.debug(f"Loaded pipeline: {pipeline}")
+
+        seed = config.get('DEFAULT', 'seed')
+        seed = int(seed) if seed else None
+        logging.debug(f"Loaded seed: {seed}")
+
+        cache_dir = config.get('DEFAULT', 'cache_dir')
+        logging.debug(f"Loaded cache_dir: {cache_dir}")
+
+        cache_size_mb = config.getint('DEFAULT', 'cache_size_mb')
+        logging.debug(f"Loaded cache_size_mb: {cache_size_mb}")
+
+        stats = config.getboolean('DEFAULT', 'stats')
+        logging.debug(f"Loaded stats: {stats}")
+
+        metrics_file = config.get('DEFAULT', 'metrics_file')
+        logging.debug(f"Loaded metrics_file: {metrics_file}")
+
+        profile = config.get('DEFAULT', 'profile')
+        logging.debug(f"Loaded profile: {profile}")
+
+        serve = config.getboolean('DEFAULT', 'serve')
+        logging.debug(f"Loaded serve: {serve}")
+
+        serve_host = config.get('DEFAULT', 'serve_host')
+        logging.debug(f"Loaded serve_host: {serve_host}")
+
+        serve_port = config.getint('DEFAULT', 'serve_port')
+        logging.debug(f"Loaded serve_port: {serve_port}")
 
         return {
             'path_to_save_files': path_to_save_files,
@@ -41,7 +99,23 @@ def load_defaults_from_config(config_file='capstone/resources/default.ini'):
             'file_prefix': file_prefix,
             'data_lines': data_lines,
             'clear_path': clear_path,
-            'multiprocessing': multiprocessing
+            'clear_mode': clear_mode,
+            'multiprocessing': multiprocessing,
+            'engine': engine,
+            'output_format': output_format,
+            'compression': compression,
+            'archive': archive,
+            'files_per_task': files_per_task,
+            'pipeline': pipeline,
+            'seed': seed,
+            'cache_dir': cache_dir,
+            'cache_size_mb': cache_size_mb,
+            'stats': stats,
+            'metrics_file': metrics_file,
+            'profile': profile,
+            'serve': serve,
+            'serve_host': serve_host,
+            'serve_port': serve_port
         }
 
     except (configparser.Error, ValueError, KeyError) as e:
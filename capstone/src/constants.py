@@ -1,2 +1,82 @@
 VALID_DATA_TYPES = {'str', 'int', 'timestamp'}
-VALID_RAND_INSTRUCTION_DATA_TYPES = {"str", "int"}
\ No newline at end of file
+VALID_RAND_INSTRUCTION_DATA_TYPES = {"str", "int"}
+
+FIELD_KIND_TIMESTAMP = "timestamp"
+FIELD_KIND_UUID = "uuid"
+FIELD_KIND_RAND_INT = "rand_int"
+FIELD_KIND_CHOICE = "choice"
+FIELD_KIND_CONSTANT = "constant"
+FIELD_KIND_FILE_CHOICE = "file_choice"
+
+FILE_INSTRUCTION_PREFIX = "@file:"
+VALUE_FILE_CHECK_BLOCK_SIZE = 1024 * 1024
+VALUE_LIST_CACHE_SIZE = 32
+
+RAND_INT_DEFAULT_RANGE = (0, 10000)
+
+RANDOM_FILE_PREFIXES = {"random", "uuid"}
+RANDOM_FILE_NUMBER_RANGE = (100000, 9999999)
+UNIQUE_FILE_NAME_ATTEMPTS = 100
+
+CLEAR_MODE_SYNC = "sync"
+CLEAR_MODE_BACKGROUND = "background"
+CLEANUP_THREADS = 8
+CLEANUP_BATCH_SIZE = 1000
+
+ENGINE_RECORD = "record"
+ENGINE_BATCH = "batch"
+VALID_ENGINES = {ENGINE_RECORD, ENGINE_BATCH}
+
+BATCH_SIZE = 10000
+STREAM_CHUNK_SIZE = 1000
+SEGMENTS_PER_PROCESS = 4
+MIN_SEGMENT_LINES = 10000
+
+OUTPUT_FORMAT_JSON = "json"
+OUTPUT_FORMAT_JSON_COMPACT = "json-compact"
+OUTPUT_FORMAT_JSONL = "jsonl"
+OUTPUT_FORMAT_EXTENSIONS = {
+    OUTPUT_FORMAT_JSON: "json",
+    OUTPUT_FORMAT_JSON_COMPACT: "json",
+    OUTPUT_FORMAT_JSONL: "jsonl"
+}
+COMPACT_SEPARATORS = (',', ':')
+
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_BZ2 = "bz2"
+COMPRESSION_LZMA = "lzma"
+COMPRESSION_EXTENSIONS = {
+    COMPRESSION_GZIP: "gz",
+    COMPRESSION_BZ2: "bz2",
+    COMPRESSION_LZMA: "xz"
+}
+GZIP_COMPRESSION_LEVEL = 6
+
+ARCHIVE_NONE = "none"
+ARCHIVE_TAR = "tar"
+ARCHIVE_ZIP = "zip"
+WRITE_BUFFER_SIZE = 1024 * 1024
+PIPELINE_QUEUE_SIZE = 8
+BATCH_RAND_INT_MAX_SPAN = 2 ** 32
+UUID_BLOCK_SIZE = 1024
+
+PROFILE_NONE = "none"
+PROFILE_CPU = "cpu"
+PROFILE_MEMORY = "memory"
+PROFILE_TOP_ENTRIES = 20
+PROFILE_SNAPSHOT_GROWTH = 1.1
+
+SERVE_BLOCK_LINES = 5000
+SERVE_PENDING_BLOCKS_PER_PROCESS = 2
+ARCHIVE_PENDING_TASKS_PER_PROCESS = 2
+SCHEMA_CACHE_SIZE = 128
+MAX_REQUEST_BODY_SIZE = 1024 * 1024
+
+# Bump when a change makes the same options generate different output, old cache entries are then never reused.
+CACHE_KEY_VERSION = 1
+CACHE_STAGING_PREFIX = ".staging-"
+
+# Options of a manifest run that are shared by every job instead of set per job.
+MANIFEST_RUN_WIDE_OPTIONS = ('multiprocessing', 'files_per_task', 'stats', 'metrics_file', 'profile',
+                             'serve', 'serve_host', 'serve_port', 'manifest', 'cache_dir', 'cache_size_mb')
@@ -3,8 +3,9 @@ import json
 import logging
 import sys
 
-from capstone.src.constants import VALID_DATA_TYPES, VALID_RAND_INSTRUCTION_DATA_TYPES
-from capstone.src.exception_utils import error_and_exit
+from capstone.src.constants import VALID_DATA_TYPES, VALID_RAND_INSTRUCTION_DATA_TYPES, FILE_INSTRUCTION_PREFIX
+from capstone.src.exception_utils import SchemaError, error_and_exit
+from capstone.src.value_lists import load_value_list
 
 def load_json_data_schema(schema_input: str) -> dict[str, str]:
     if os.path.isfile(schema_input):
@@ -17,7 +18,9 @@ def load_json_data_schema(schema_input: str) -> dict[str, str]:
             logging.error(f"Failed to load schema from file '{schema_input}': {e}")
             sys.exit(1)
 
-    if schema_input.endswith('.json') or os.path.sep in schema_input:
+    # Inline schemas can hold paths too (str:@file:...), only input that isn't a JSON object is a file name.
+    is_inline = schema_input.lstrip().startswith('{')
+    if not is_inline and (schema_input.endswith('.json') or os.path.sep in schema_input):
         logging.error(f"JSON schema file not found: {schema_input} (Current directory: {os.getcwd()})")
         sys.exit(1)
 
@@ -30,15 +33,32 @@ def load_json_data_schema(schema_input: str) -> dict[str, str]:
         logging.error("Make sure to properly escape quotes in command line JSON")
         sys.exit(1)
 
+def get_value_file_paths(schema: dict) -> list[str]:
+    # Paths of the @file: value lists a schema reads, values that aren't valid instructions are skipped.
+    paths = []
+    for raw_value in schema.values() if isinstance(schema, dict) else []:
+        if isinstance(raw_value, str) and ":" in raw_value:
+            instruction = raw_value.split(":", 1)[1].strip()
+            if instruction.startswith(FILE_INSTRUCTION_PREFIX):
+                paths.append(instruction[len(FILE_INSTRUCTION_PREFIX):].strip())
+    return paths
+
 def validate_data_schema(schema: dict[str, str]) -> dict[str, str]:
+    # CLI boundary: the checks raise SchemaError, the command line logs it and exits.
+    try:
+        return check_data_schema(schema)
+    except SchemaError as e:
+        error_and_exit(str(e))
+
+def check_data_schema(schema: dict[str, str]) -> dict[str, str]:
     if not isinstance(schema, dict):
-        error_and_exit(
+        raise SchemaError(
             "Invalid data schema format. It must be a JSON object (dictionary).\n"
             "See --help for examples."
         )
 
     if not schema:
-        error_and_exit("Data schema cannot be empty")
+        raise SchemaError("Data schema cannot be empty")
 
     for key, raw_value in schema.items():
         validate_schema_field(key, raw_value)
@@ -46,8 +66,11 @@ def validate_data_schema(schema: dict[str, str]) -> dict[str, str]:
     return schema
 
 def validate_schema_field(key: str, raw_value: str) -> None:
+    if not isinstance(raw_value, str):
+        raise SchemaError(f"Schema value for key '{key}' must be a string (type:instruction), got {raw_value!r}.")
+
     if ":" not in raw_value:
-        error_and_exit(
+        raise SchemaError(
             f"Schema value for type of data '{raw_value}' must contain a colon (type:instruction). "
             "See --help for examples."
         )
@@ -60,7 +83,7 @@ def validate_schema_field(key: str, raw_value: str) -> None:
 
 def validate_type_part(key: str, type_part: str, raw_value: str) -> None:
     if type_part not in VALID_DATA_TYPES:
-        error_and_exit(
+        raise SchemaError(
             f"Invalid type '{type_part}' in key '{key}' (value: '{raw_value}'). "
             f"Supported types: {', '.join(VALID_DATA_TYPES)}.\n"
             "Please check --help for the proper format."
@@ -69,7 +92,7 @@ def validate_type_part(key: str, type_part: str, raw_value: str) -> None:
 def validate_instruction_part(key: str, type_part: str, instruction_part: str, raw_value: str) -> None:
     if type_part == "timestamp":
         if instruction_part:
-            error_and_exit(
+            raise SchemaError(
                 f"Key '{key}': timestamp type does not accept any instructions. "
                 f"Value '{instruction_part}' which will be ignored."
             )
@@ -90,19 +113,23 @@ def validate_instruction_part(key: str, type_part: str, instruction_part: str, r
         validate_list_instruction(key, type_part, instruction_part)
         return
 
+    if instruction_part.startswith(FILE_INSTRUCTION_PREFIX):
+        validate_file_instruction(key, type_part, instruction_part)
+        return
+
     validate_constant_instruction(key, type_part, instruction_part)
 
 
 def validate_rand_instruction(key: str, type_part: str, raw_value: str) -> None:
     if type_part not in VALID_RAND_INSTRUCTION_DATA_TYPES:
-        error_and_exit(
+        raise SchemaError(
             f"'rand' instruction is only valid for str or int "
             f"(error in key '{key}', value '{raw_value}')."
         )
 
 def validate_rand_range_instruction(key: str, type_part: str, instruction_part: str, raw_value: str) -> None:
     if type_part != "int":
-        error_and_exit(
+        raise SchemaError(
             f"rand(from, to) is only valid for int type "
             f"(error in key '{key}', value '{raw_value}')."
         )
@@ -110,47 +137,57 @@ def validate_rand_range_instruction(key: str, type_part: str, instruction_part:
     try:
         lower_str, upper_str = (s.strip() for s in instruction_part[5:-1].split(",", 1))
         lower_bound, upper_bound = int(lower_str), int(upper_str)
-
-        if lower_bound > upper_bound:
-            error_and_exit(
-                f"Invalid range rand({lower_bound}, {upper_bound}) in key '{key}'. "
-                "Lower bound must not exceed upper bound."
-            )
-
     except (ValueError, IndexError):
-        error_and_exit(
+        raise SchemaError(
             f"Invalid format in rand(from, to) at key '{key}'. "
             "Example: int:rand(1, 90)"
+        ) from None
+
+    if lower_bound > upper_bound:
+        raise SchemaError(
+            f"Invalid range rand({lower_bound}, {upper_bound}) in key '{key}'. "
+            "Lower bound must not exceed upper bound."
         )
 
 def validate_list_instruction(key: str, type_part: str, instruction_part: str) -> None:
     try:
         items = json.loads(instruction_part.replace("'", '"'))
+    except json.JSONDecodeError:
+        raise SchemaError(
+            f"List instruction in key '{key}' must be valid JSON/array syntax."
+        ) from None
 
-        if not isinstance(items, list):
-            error_and_exit(
-                f"Instruction in key '{key}' must be a list when in [...] form."
-            )
+    if not isinstance(items, list):
+        raise SchemaError(
+            f"Instruction in key '{key}' must be a list when in [...] form."
+        )
 
-        if type_part == "str" and not all(isinstance(x, str) for x in items):
-            error_and_exit(
-                f"All elements in list for key '{key}' must be strings (type is str)."
-            )
+    if type_part == "str" and not all(isinstance(x, str) for x in items):
+        raise SchemaError(
+            f"All elements in list for key '{key}' must be strings (type is str)."
+        )
 
-        if type_part == "int" and not all(isinstance(x, int) for x in items):
-            error_and_exit(
-                f"All elements in list for key '{key}' must be ints (type is int)."
-            )
+    if type_part == "int" and not all(isinstance(x, int) for x in items):
+        raise SchemaError(
+            f"All elements in list for key '{key}' must be ints (type is int)."
+        )
 
-    except json.JSONDecodeError:
-        error_and_exit(
-            f"List instruction in key '{key}' must be valid JSON/array syntax."
+def validate_file_instruction(key: str, type_part: str, instruction_part: str) -> None:
+    if type_part != "str":
+        raise SchemaError(
+            f"@file: value lists are only valid for str type (error in key '{key}')."
         )
 
+    # The file is loaded once per process, the compiled schema reuses this load.
+    try:
+        load_value_list(instruction_part[len(FILE_INSTRUCTION_PREFIX):].strip())
+    except ValueError as e:
+        raise SchemaError(f"Invalid @file: value list in key '{key}': {e}") from None
+
 def validate_constant_instruction(key: str, type_part: str, instruction: str) -> None:
     if type_part == "str":
         if instruction == "rand":
-            error_and_exit(
+            raise SchemaError(
                 f"Schema value for key '{key}' is invalid: '{instruction}'. "
                 "It must contain a colon (type:instruction). "
                 "See --help for examples."
@@ -160,7 +197,7 @@ def validate_constant_instruction(key: str, type_part: str, instruction: str) ->
     try:
         int(instruction)
     except ValueError:
-        error_and_exit(
+        raise SchemaError(
             f"Invalid format in key '{key}'. Expected format: type:instruction. "
             "See --help for examples."
-        )
\ No newline at end of file
+        ) from None
\ No newline at end of file
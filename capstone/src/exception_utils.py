@@ -3,4 +3,12 @@ import logging
 
 def error_and_exit(msg: str) -> None:
     logging.error(msg)
-    sys.exit(1)
\ No newline at end of file
+    sys.exit(1)
+
+
+class WorkerError(Exception):
+    pass
+
+
+class SchemaError(ValueError):
+    pass
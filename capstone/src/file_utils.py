@@ -1,25 +1,166 @@
 import logging
 import os
-import glob
 import sys
 import json
+import io
+import importlib
+import threading
+import time
+from contextlib import nullcontext
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, TextIO
 
-def clear_existing_files(path_to_save_files: str, file_name: str) -> None:
-    pattern = os.path.join(path_to_save_files, f"{file_name}*.json")
-    existing_files = glob.glob(pattern)
-
-    if existing_files:
-        logging.info(f"Clearing {len(existing_files)} existing files matching pattern: {file_name}*.json")
-        for file_path in existing_files:
-            try:
-                os.remove(file_path)
-                logging.debug(f"Deleted file: {file_path}")
-            except OSError as e:
-                logging.error(f"Failed to delete file {file_path}: {e}")
-                sys.exit(1)
-        logging.info(f"Successfully cleared {len(existing_files)} existing files")
+from capstone.src.constants import (OUTPUT_FORMAT_JSON, OUTPUT_FORMAT_JSON_COMPACT, OUTPUT_FORMAT_JSONL,
+                                    COMPACT_SEPARATORS, WRITE_BUFFER_SIZE, CLEANUP_THREADS, CLEANUP_BATCH_SIZE,
+                                    OUTPUT_FORMAT_EXTENSIONS, COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_BZ2,
+                                    COMPRESSION_LZMA, COMPRESSION_EXTENSIONS, GZIP_COMPRESSION_LEVEL)
+
+# The encoders below take chunks of dicts, the ones compiled by record_encoder take
+# chunks of plan ordered rows.
+ChunkEncoder = Callable[[list], str]
+
+# Compression modules are imported on first use, most runs never need them.
+COMPRESSION_MODULES = {
+    COMPRESSION_GZIP: 'gzip',
+    COMPRESSION_BZ2: 'bz2',
+    COMPRESSION_LZMA: 'lzma'
+}
+
+COMPRESSION_OPTIONS = {
+    COMPRESSION_GZIP: {'compresslevel': GZIP_COMPRESSION_LEVEL}
+}
+
+
+def get_output_extension(output_format: str, compression: str = COMPRESSION_NONE) -> str:
+    extension = OUTPUT_FORMAT_EXTENSIONS[output_format]
+    if compression == COMPRESSION_NONE:
+        return extension
+    return f"{extension}.{COMPRESSION_EXTENSIONS[compression]}"
+
+
+def open_output_file(file_path: str, mode: str = 'w', compression: str = COMPRESSION_NONE) -> TextIO:
+    # Compressed files are written as a stream, records are compressed as they are produced.
+    if compression == COMPRESSION_NONE:
+        return open(file_path, mode, buffering=WRITE_BUFFER_SIZE)
+    compression_module = importlib.import_module(COMPRESSION_MODULES[compression])
+    return compression_module.open(file_path, f"{mode}t", **COMPRESSION_OPTIONS.get(compression, {}))
+
+
+def compress_frame(text: str, compression: str) -> bytes:
+    data = text.encode()
+    if compression == COMPRESSION_NONE or not data:
+        return data
+    compression_module = importlib.import_module(COMPRESSION_MODULES[compression])
+    return compression_module.compress(data, **COMPRESSION_OPTIONS.get(compression, {}))
+
+def iter_matching_files(directory: str, file_name: str, extension: str) -> Iterator[str]:
+    # Streams os.scandir entries instead of building a full glob list.
+    # Hidden entries are skipped like glob does, which also leaves temporary
+    # segment and trash directories alone.
+    suffix = f".{extension}"
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (entry.name.startswith(file_name) and entry.name.endswith(suffix)
+                    and not entry.name.startswith('.') and entry.is_file(follow_symlinks=False)):
+                yield entry.path
+
+
+def iter_batches(items: Iterable[str], batch_size: int) -> Iterator[list[str]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def remove_files(file_paths: list[str]) -> tuple[int, list[str]]:
+    removed = 0
+    errors = []
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            errors.append(f"Failed to delete file {file_path}: {e}")
+    return removed, errors
+
+
+def delete_files_in_parallel(file_paths: Iterable[str]) -> tuple[int, list[str]]:
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    started = time.perf_counter()
+    removed = 0
+    errors = []
+    pending = set()
+
+    def collect(done: set) -> None:
+        nonlocal removed
+        for future in done:
+            batch_removed, batch_errors = future.result()
+            removed += batch_removed
+            errors.extend(batch_errors)
+        elapsed = time.perf_counter() - started
+        logging.info(f"Cleared {removed} files so far ({removed / elapsed if elapsed else 0:.0f} files/s)")
+
+    with ThreadPoolExecutor(max_workers=CLEANUP_THREADS) as executor:
+        for batch in iter_batches(file_paths, CLEANUP_BATCH_SIZE):
+            pending.add(executor.submit(remove_files, batch))
+            # Keep the number of queued batches bounded, so the scan never runs far ahead.
+            if len(pending) >= CLEANUP_THREADS * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        if pending:
+            collect(wait(pending)[0])
+
+    return removed, errors
+
+
+def delete_trash_directory(trash_dir: str) -> None:
+    import shutil
+
+    removed, errors = delete_files_in_parallel(os.path.join(trash_dir, name) for name in os.listdir(trash_dir))
+    for error in errors:
+        logging.error(error)
+    shutil.rmtree(trash_dir, ignore_errors=True)
+    logging.info(f"Background cleanup finished, removed {removed} files")
+
+
+def clear_existing_files(path_to_save_files: str, file_name: str, extension: str = 'json',
+                         background: bool = False) -> threading.Thread | None:
+    pattern = f"{file_name}*.{extension}"
+    matching_files = iter_matching_files(path_to_save_files, file_name, extension)
+
+    if background:
+        # Renaming only touches directory metadata, the files themselves are removed
+        # by a thread while the new files are already being generated.
+        import tempfile
+        trash_dir = tempfile.mkdtemp(prefix=f".{file_name}_trash_", dir=path_to_save_files)
+        moved = 0
+        try:
+            for file_path in matching_files:
+                os.rename(file_path, os.path.join(trash_dir, os.path.basename(file_path)))
+                moved += 1
+        except OSError as e:
+            logging.error(f"Failed to move existing files to {trash_dir}: {e}")
+            sys.exit(1)
+
+        logging.info(f"Moved {moved} existing files matching pattern: {pattern} to be deleted in the background")
+        cleanup_thread = threading.Thread(target=delete_trash_directory, args=(trash_dir,), name='cleanup')
+        cleanup_thread.start()
+        return cleanup_thread
+
+    logging.info(f"Clearing existing files matching pattern: {pattern}")
+    removed, errors = delete_files_in_parallel(matching_files)
+    if errors:
+        for error in errors:
+            logging.error(error)
+        sys.exit(1)
+
+    if removed:
+        logging.info(f"Successfully cleared {removed} existing files")
     else:
-        logging.info(f"No existing files found matching pattern: {file_name}*.json")
+        logging.info(f"No existing files found matching pattern: {pattern}")
+    return None
 
 
 def print_data_to_console(data: list[dict]) -> None:
@@ -31,6 +172,44 @@ def print_data_to_console(data: list[dict]) -> None:
         sys.exit(1)
 
 
+def open_stdout_buffer() -> BinaryIO:
+    # A large binary buffer on the stdout descriptor instead of the 8 KB text layer.
+    # Streams without a descriptor (captured stdout) are written through their own buffer.
+    sys.stdout.flush()
+    try:
+        return open(sys.stdout.fileno(), 'wb', buffering=WRITE_BUFFER_SIZE, closefd=False)
+    except (AttributeError, io.UnsupportedOperation):
+        return nullcontext(sys.stdout.buffer)
+
+
+def redirect_stdout_to_devnull() -> None:
+    # Anything still buffered for the closed pipe is flushed to devnull on exit
+    # instead of raising BrokenPipeError a second time.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, sys.stdout.fileno())
+    except (AttributeError, io.UnsupportedOperation):
+        pass
+    os.close(devnull)
+
+
+def stream_data_to_stdout(chunks: Iterable[list[dict]], encode_chunk: ChunkEncoder | None = None) -> int:
+    encode_chunk = encode_chunk or CHUNK_ENCODERS[OUTPUT_FORMAT_JSONL]
+
+    records_count = 0
+    with open_stdout_buffer() as out:
+        try:
+            for chunk in chunks:
+                out.write(encode_chunk(chunk).encode())
+                records_count += len(chunk)
+            out.flush()
+        except BrokenPipeError:
+            # The reader has gone away (e.g. `magicgenerator ... | head`), stop generating.
+            redirect_stdout_to_devnull()
+            logging.info(f"Output pipe closed by the reader, stopped after {records_count} records")
+    return records_count
+
+
 def save_data_to_file(data: list[dict], file_path: str) -> None:
     try:
         with open(file_path, 'w') as f:
@@ -38,4 +217,115 @@ def save_data_to_file(data: list[dict], file_path: str) -> None:
         logging.info(f"Successfully saved {len(data)} records to: {file_path}")
     except (OSError, TypeError, ValueError) as e:
         logging.error(f"Error saving data to file {file_path}: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+# Chunk encoders turn a list of records into the text between the array brackets.
+# Writers add the framing, so any encoder producing the same text can be swapped in.
+
+def encode_json_chunk(chunk: list[dict]) -> str:
+    # Serialize the chunk as an indented array and drop its brackets,
+    # so the file matches json.dump(data, f, indent=2) byte for byte.
+    return json.dumps(chunk, indent=2)[2:-2]
+
+
+def encode_compact_json_chunk(chunk: list[dict]) -> str:
+    return json.dumps(chunk, separators=COMPACT_SEPARATORS)[1:-1]
+
+
+def encode_jsonl_chunk(chunk: list[dict]) -> str:
+    return ''.join([f"{json.dumps(record, separators=COMPACT_SEPARATORS)}\n" for record in chunk])
+
+
+CHUNK_ENCODERS = {
+    OUTPUT_FORMAT_JSON: encode_json_chunk,
+    OUTPUT_FORMAT_JSON_COMPACT: encode_compact_json_chunk,
+    OUTPUT_FORMAT_JSONL: encode_jsonl_chunk
+}
+
+# (opening, separator between encoded chunks, closing, content of an empty file)
+OUTPUT_FRAMES = {
+    OUTPUT_FORMAT_JSON: ('[\n', ',\n', '\n]', '[]'),
+    OUTPUT_FORMAT_JSON_COMPACT: ('[', ',', ']', '[]'),
+    OUTPUT_FORMAT_JSONL: ('', '', '', '')
+}
+
+
+def write_chunks(f: TextIO, chunks: Iterable[list[dict]], output_format: str,
+                 encode_chunk: ChunkEncoder | None = None) -> int:
+    opening, separator, closing, empty = OUTPUT_FRAMES[output_format]
+    encode_chunk = encode_chunk or CHUNK_ENCODERS[output_format]
+
+    records_count = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        f.write(separator if records_count else opening)
+        f.write(encode_chunk(chunk))
+        records_count += len(chunk)
+    f.write(closing if records_count else empty)
+    return records_count
+
+
+def stream_data_to_file(chunks: Iterable[list[dict]], file_path: str, output_format: str = OUTPUT_FORMAT_JSON,
+                        append: bool = False, encode_chunk: ChunkEncoder | None = None,
+                        compression: str = COMPRESSION_NONE) -> int:
+    if append and output_format != OUTPUT_FORMAT_JSONL:
+        logging.error(f"Appending is only supported for the {OUTPUT_FORMAT_JSONL} output format, got: {output_format}")
+        sys.exit(1)
+
+    try:
+        with open_output_file(file_path, 'a' if append else 'w', compression) as f:
+            records_count = write_chunks(f, chunks, output_format, encode_chunk)
+        logging.info(f"Successfully saved {records_count} records to: {file_path}")
+    except (OSError, TypeError, ValueError) as e:
+        logging.error(f"Error saving data to file {file_path}: {e}")
+        sys.exit(1)
+    return records_count
+
+
+def write_segment(chunks: Iterable[list[dict]], segment_path: str, output_format: str,
+                  encode_chunk: ChunkEncoder | None = None, compression: str = COMPRESSION_NONE) -> int:
+    # A segment holds encoded chunks without the file opening and closing,
+    # so several segments can be stitched into one valid file. Compressed segments
+    # are complete gzip/bz2/xz members, and concatenated members form a valid file.
+    separator = OUTPUT_FRAMES[output_format][1]
+    encode_chunk = encode_chunk or CHUNK_ENCODERS[output_format]
+
+    records_count = 0
+    try:
+        with open_output_file(segment_path, 'w', compression) as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if records_count:
+                    f.write(separator)
+                f.write(encode_chunk(chunk))
+                records_count += len(chunk)
+    except (OSError, TypeError, ValueError) as e:
+        logging.error(f"Error saving data segment {segment_path}: {e}")
+        sys.exit(1)
+    return records_count
+
+
+def stitch_segments(segments: Iterable[tuple[str, int]], file_path: str, output_format: str,
+                    compression: str = COMPRESSION_NONE) -> int:
+    import shutil
+
+    opening, separator, closing, empty = (compress_frame(part, compression) for part in OUTPUT_FRAMES[output_format])
+
+    records_count = 0
+    try:
+        with open(file_path, 'wb') as f:
+            for segment_path, segment_records in segments:
+                if segment_records:
+                    f.write(separator if records_count else opening)
+                    with open(segment_path, 'rb') as segment:
+                        shutil.copyfileobj(segment, f, WRITE_BUFFER_SIZE)
+                    records_count += segment_records
+                os.remove(segment_path)
+            f.write(closing if records_count else empty)
+        logging.info(f"Successfully saved {records_count} records to: {file_path}")
+    except OSError as e:
+        logging.error(f"Error saving data to file {file_path}: {e}")
+        sys.exit(1)
+    return records_count
\ No newline at end of file
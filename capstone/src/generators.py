@@ -1,136 +1,562 @@
 import time
 import uuid
 import random
-import json
 import logging
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 import os
-import multiprocessing
-
-from capstone.src.file_utils import clear_existing_files, print_data_to_console, save_data_to_file
-
-def generate_value(type_part: str, instruction_part: str) -> Any:
-    if type_part == "timestamp":
-        return time.time()
-
-    if instruction_part == "":
-        return "" if type_part == "str" else None
-
-    if instruction_part == "rand":
-        return str(uuid.uuid4()) if type_part == "str" else random.randint(0, 10000)
-
-    if instruction_part.startswith("rand(") and instruction_part.endswith(")"):
-        lower_str, upper_str = (s.strip() for s in instruction_part[5:-1].split(",", 1))
-        lower_bound, higher_bound = int(lower_str), int(upper_str)
-        return random.randint(lower_bound, higher_bound)
-
-    if instruction_part.startswith("[") and instruction_part.endswith("]"):
-        items = json.loads(instruction_part.replace("'", '"'))
-        return random.choice(items)
-
-    return instruction_part if type_part == "str" else int(instruction_part)
-
-def generate_file_name(file_name: str, file_prefix: str, index: int) -> str:
+import io
+import math
+import threading
+from functools import lru_cache, wraps
+
+from capstone.src.file_utils import (clear_existing_files, stream_data_to_stdout, stream_data_to_file,
+                                     write_segment, stitch_segments, get_output_extension, write_chunks)
+from capstone.src.schema_plan import (CompiledField, compile_schema_field, compile_data_schema,
+                                      generate_record_from_plan, records_from_rows)
+from capstone.src.batch_generators import generate_batch_rows
+from capstone.src.record_encoder import compile_chunk_encoder
+from capstone.src.metrics import (enable_metrics, metrics_enabled, measure_stage, measure_write, timed_chunks,
+                                  timed_encoder, add_output, add_file_output, take_worker_metrics,
+                                  collect_worker_metrics, build_metrics_report, log_metrics_summary,
+                                  write_metrics_file)
+from capstone.src.profiling import (start_profiling, stop_profiling, sample_memory_peak, take_worker_profile,
+                                    collect_worker_profiles, log_profile_report)
+from capstone.src.constants import (ENGINE_BATCH, ENGINE_RECORD, STREAM_CHUNK_SIZE, OUTPUT_FORMAT_JSON,
+                                    COMPRESSION_NONE, SEGMENTS_PER_PROCESS, MIN_SEGMENT_LINES,
+                                    RANDOM_FILE_PREFIXES, RANDOM_FILE_NUMBER_RANGE, UNIQUE_FILE_NAME_ATTEMPTS, CLEAR_MODE_BACKGROUND,
+                                    ARCHIVE_NONE, OUTPUT_FORMAT_EXTENSIONS, PROFILE_NONE,
+                                    OUTPUT_FORMAT_JSONL, ARCHIVE_PENDING_TASKS_PER_PROCESS,
+                                    FIELD_KIND_TIMESTAMP)
+from capstone.src.exception_utils import WorkerError, error_and_exit
+
+def generate_value(type_part: str, instruction_part: str, rng: random.Random | None = None) -> Any:
+    # A single value, parsed by the schema plan compiler. Bulk generation compiles the schema once instead.
+    return compile_schema_field("", f"{type_part}:{instruction_part}").generate(rng)
+
+def generate_file_name(file_name: str, file_prefix: str, index: int, extension: str = 'json',
+                       rng: random.Random | None = None, seed: int | None = None) -> str:
     if file_prefix == 'count':
-        return f'{file_name}_{index}.json'
+        return f'{file_name}_{index}.{extension}'
     elif file_prefix == 'random':
-        return f"{file_name}_{random.randint(100000, 9999999)}.json"
+        number = (seeded_file_number(seed, index) if seed is not None
+                  else (rng or random).randint(*RANDOM_FILE_NUMBER_RANGE))
+        return f"{file_name}_{number}.{extension}"
     elif file_prefix == 'uuid':
-        return f"{file_name}_{uuid.uuid4()}.json"
+        file_uuid = uuid.uuid4() if rng is None else uuid.UUID(int=rng.getrandbits(128), version=4)
+        return f"{file_name}_{file_uuid}.{extension}"
     else:
-        return f"{file_name}_{index}.json"
-
-def generate_unique_file_name(directory: str, file_name: str, file_prefix: str, index: int) -> str:
-    attempt = 0
-
-    while True:
-        filename = generate_file_name(file_name, file_prefix, index)
+        return f"{file_name}_{index}.{extension}"
+
+# With --seed every file index gets its own random streams, derived from the seed, the index
+# and the purpose of the stream (file name, or the first row of a chunk of records).
+# Output then doesn't depend on which process generates a file, or in which order.
+
+def derive_rng(seed: int | None, file_index: int, stream: str | int) -> random.Random | None:
+    if seed is None:
+        return None
+    # String seeds are hashed with SHA-512, unaffected by PYTHONHASHSEED and the same in every process.
+    return random.Random(f"{seed}:{file_index}:{stream}")
+
+@lru_cache(maxsize=None)
+def _file_number_permutation(seed: int) -> tuple[int, int]:
+    rng = random.Random(f"{seed}:name")
+    size = RANDOM_FILE_NUMBER_RANGE[1] - RANDOM_FILE_NUMBER_RANGE[0] + 1
+    multiplier = rng.randrange(1, size)
+    while math.gcd(multiplier, size) != 1:
+        multiplier = rng.randrange(1, size)
+    return multiplier, rng.randrange(size)
+
+def seeded_file_number(seed: int, index: int) -> int:
+    # (multiplier * index + offset) % size with a multiplier coprime to size is a permutation of the range:
+    # different indices never draw the same number, so seeded names don't depend on which worker asks first.
+    multiplier, offset = _file_number_permutation(seed)
+    size = RANDOM_FILE_NUMBER_RANGE[1] - RANDOM_FILE_NUMBER_RANGE[0] + 1
+    return RANDOM_FILE_NUMBER_RANGE[0] + (multiplier * index + offset) % size
+
+def generate_unique_file_name(directory: str, file_name: str, file_prefix: str, index: int,
+                              extension: str = 'json', seed: int | None = None) -> str:
+    # Only a file left from an earlier run makes a seeded name retry, with the index's own random stream.
+    rng = derive_rng(seed, index, 'name')
+    for attempt in range(1, UNIQUE_FILE_NAME_ATTEMPTS + 1):
+        filename = generate_file_name(file_name, file_prefix, index, extension, rng, seed if attempt == 1 else None)
         file_path = os.path.join(directory, filename)
 
-        if not os.path.exists(file_path):
+        # O_EXCL makes the existence check and the creation a single atomic step,
+        # so concurrent workers can never be handed the same file name.
+        try:
+            os.close(os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
             return file_path
+        except FileExistsError:
+            if file_prefix not in RANDOM_FILE_PREFIXES:
+                error_and_exit(f"File already exists: {file_path}. "
+                               "Use --clear_path to remove previously generated files.")
+        except OSError as e:
+            error_and_exit(f"Failed to create file {file_path}: {e}")
 
-        attempt += 1
         if attempt % 10 == 0:
             logging.warning(f"[Retry {attempt}] Still trying to generate a unique filename for index {index}")
 
-def generate_data_record(data_schema: dict[str, str]) -> dict:
-    record = {}
-    for key, raw_value in data_schema.items():
-        type_part, instruction_part = (part.strip() for part in raw_value.split(":", 1))
-        record[key] = generate_value(type_part, instruction_part)
-    return record
+    error_and_exit(f"Could not generate a unique filename for index {index} "
+                   f"after {UNIQUE_FILE_NAME_ATTEMPTS} attempts")
+
+def generate_data_record(data_schema: dict[str, str], rng: random.Random | None = None) -> dict:
+    return generate_record_from_plan(compile_data_schema(data_schema), rng)
+
+def generate_data_rows(schema_plan: list[CompiledField], data_lines: int, engine: str = ENGINE_RECORD,
+                       rng: random.Random | None = None) -> list[tuple]:
+    if engine == ENGINE_BATCH:
+        return generate_batch_rows(schema_plan, data_lines, rng)
+
+    field_generators = [field.generate for field in schema_plan]
+    return [tuple([generate(rng) for generate in field_generators]) for _ in range(data_lines)]
+
+def generate_data_lines(schema_plan: list[CompiledField], data_lines: int, engine: str = ENGINE_RECORD,
+                        rng: random.Random | None = None) -> list[dict]:
+    return records_from_rows(schema_plan, generate_data_rows(schema_plan, data_lines, engine, rng))
+
+def iter_data_chunks(schema_plan: list[CompiledField], data_lines: int, engine: str = ENGINE_RECORD,
+                     chunk_size: int = STREAM_CHUNK_SIZE, seed: int | None = None, file_index: int = 0,
+                     first_line: int = 0) -> Iterator[list[tuple]]:
+    # Chunks hold rows, not dicts, the compiled chunk encoders read the values by position.
+    # A seeded chunk's stream is keyed by its first line, so a file generated in segments
+    # is identical to one generated at once, as long as segments start on a chunk boundary.
+    for start in range(first_line, first_line + data_lines, chunk_size):
+        rng = derive_rng(seed, file_index, start)
+        chunk = generate_data_rows(schema_plan, min(chunk_size, first_line + data_lines - start), engine, rng)
+        sample_memory_peak()
+        yield chunk
+
+def generate_and_save_file(schema_plan: list[CompiledField], data_lines: int, engine: str, file_path: str,
+                           output_format: str = OUTPUT_FORMAT_JSON, compression: str = COMPRESSION_NONE,
+                           seed: int | None = None, file_index: int = 0) -> None:
+    encode_chunk = timed_encoder(compile_chunk_encoder(schema_plan, output_format))
+    chunks = iter_data_chunks(schema_plan, data_lines, engine, seed=seed, file_index=file_index)
+    with measure_write():
+        records_count = stream_data_to_file(timed_chunks(chunks), file_path, output_format,
+                                            encode_chunk=encode_chunk, compression=compression)
+    add_file_output(file_path, records_count)
+
+def build_generation_context(args: dict, schema_plan: list[CompiledField]) -> dict:
+    return {'path_to_save_files': args['path_to_save_files'],
+            'file_name': args['file_name'],
+            'file_prefix': args['file_prefix'],
+            'data_lines': args['data_lines'],
+            'schema_plan': schema_plan,
+            'engine': args['engine'],
+            'output_format': args['output_format'],
+            'compression': args['compression'],
+            'pipeline': args['pipeline'],
+            'archive': args['archive'],
+            'seed': args['seed'],
+            'metrics': metrics_enabled(),
+            'profile': args['profile']
+            }
+
+def iter_file_paths(context: dict, file_indices: Iterable[int]) -> Iterator[tuple[int, str]]:
+    extension = get_output_extension(context['output_format'], context['compression'])
+
+    for i in file_indices:
+        unique_filename = generate_unique_file_name(
+            context['path_to_save_files'],
+            context['file_name'],
+            context['file_prefix'],
+            i,
+            extension,
+            context['seed']
+        )
+        yield i, os.path.join(context['path_to_save_files'], unique_filename)
+
+def generate_files(context: dict, file_indices: Iterable[int]) -> None:
+    schema_plan = context['schema_plan']
+
+    if context['pipeline']:
+        from capstone.src.pipeline import run_write_pipeline
+        file_jobs = ((file_path, iter_data_chunks(schema_plan, context['data_lines'], context['engine'],
+                                                  seed=context['seed'], file_index=i))
+                     for i, file_path in iter_file_paths(context, file_indices))
+        run_write_pipeline(file_jobs, context['output_format'],
+                           compile_chunk_encoder(schema_plan, context['output_format']), context['compression'])
+        return
+
+    for i, file_path in iter_file_paths(context, file_indices):
+        generate_and_save_file(schema_plan, context['data_lines'], context['engine'],
+                               file_path, context['output_format'], context['compression'], context['seed'], i)
+
+def generate_file_content(context: dict, file_index: int = 0) -> bytes:
+    schema_plan = context['schema_plan']
+    chunks = timed_chunks(iter_data_chunks(schema_plan, context['data_lines'], context['engine'],
+                                           seed=context['seed'], file_index=file_index))
+    encode_chunk = timed_encoder(compile_chunk_encoder(schema_plan, context['output_format']))
+
+    buffer = io.StringIO()
+    records_count = write_chunks(buffer, chunks, context['output_format'], encode_chunk)
+    add_output(records_count, files=1)
+    return buffer.getvalue().encode()
+
+def build_member_namer(context: dict) -> Callable[[int], str]:
+    extension = OUTPUT_FORMAT_EXTENSIONS[context['output_format']]
+    used_names = set()
+
+    def name_member(index: int) -> str:
+        rng = derive_rng(context['seed'], index, 'name')
+        for attempt in range(UNIQUE_FILE_NAME_ATTEMPTS):
+            member_name = generate_file_name(context['file_name'], context['file_prefix'], index, extension, rng,
+                                             context['seed'] if attempt == 0 else None)
+            if member_name not in used_names:
+                used_names.add(member_name)
+                return member_name
+        error_and_exit(f"Could not generate a unique archive member name for index {index}")
+
+    return name_member
+
+def generate_archive(context: dict, files_count: int, process_count: int, files_per_task: int) -> None:
+    # Generator processes only encode file contents, the parent is the single writer
+    # that appends every file to the archive as soon as it arrives.
+    from capstone.src.archive_sink import get_archive_extension, write_archive
+    archive_extension = get_archive_extension(context['archive'], context['compression'])
+    archive_path = os.path.join(context['path_to_save_files'], f"{context['file_name']}.{archive_extension}")
+    if os.path.exists(archive_path):
+        error_and_exit(f"Archive already exists: {archive_path}. Use --clear_path to remove it.")
+
+    if process_count <= 1:
+        logging.info(f"Using single process to generate {files_count} files into {archive_path}")
+        members = ((i, generate_file_content(context, i)) for i in range(1, files_count + 1))
+        with measure_write():
+            write_archive(members, build_member_namer(context), archive_path, context['archive'],
+                          context['compression'])
+        add_file_output(archive_path, 0, files=0)
+        return
 
-def generate_data_lines(data_schema: dict[str, str], data_lines: int) -> list[dict]:
-    return [generate_data_record(data_schema) for _ in range(data_lines)]
+    tasks = split_file_indices(files_count, files_per_task)
+    process_count = min(process_count, len(tasks))
+    logging.info(f"Using {process_count} generator processes and one writer for archive {archive_path}")
+
+    # The parent writer can be slower than the generators (e.g. xz), so only a few encoded
+    # batches are in flight at a time instead of the whole archive piling up in memory.
+    with create_pool(process_count, init_worker, context) as pool:
+        results = collect_worker_metrics(collect_worker_profiles(
+            imap_bounded(pool, worker_generate_archive_members, tasks,
+                         process_count * ARCHIVE_PENDING_TASKS_PER_PROCESS)))
+        members = (member for (batch,) in results for member in batch)
+        with measure_write():
+            write_archive(members, build_member_namer(context), archive_path, context['archive'],
+                          context['compression'])
+    add_file_output(archive_path, 0, files=0)
+
+def start_run(args: dict) -> float:
+    enable_metrics(args['stats'] or bool(args['metrics_file']))
+    start_profiling(args['profile'])
+    return time.perf_counter()
+
+def finish_run(args: dict, started: float) -> None:
+    log_profile_report(stop_profiling())
+
+    if metrics_enabled():
+        report = build_metrics_report(time.perf_counter() - started)
+        if args['stats']:
+            log_metrics_summary(report)
+        if args['metrics_file']:
+            write_metrics_file(report, args['metrics_file'])
+
+def get_output_file_extension(args: dict) -> str:
+    if args['archive'] != ARCHIVE_NONE:
+        from capstone.src.archive_sink import get_archive_extension
+        return get_archive_extension(args['archive'], args['compression'])
+    return get_output_extension(args['output_format'], args['compression'])
+
+def start_cleanup(args: dict) -> threading.Thread | None:
+    if not args['clear_path']:
+        return None
+
+    with measure_stage('cleanup'):
+        return clear_existing_files(args['path_to_save_files'], args['file_name'], get_output_file_extension(args),
+                                    background=args['clear_mode'] == CLEAR_MODE_BACKGROUND)
+
+def join_cleanup(cleanup_threads: Iterable[threading.Thread | None]) -> None:
+    with measure_stage('cleanup'):
+        for cleanup_thread in cleanup_threads:
+            if cleanup_thread is not None:
+                cleanup_thread.join()
 
 def generate_and_save_data(args: dict) -> None:
-    if args['clear_path']:
-        clear_existing_files(args['path_to_save_files'], args['file_name'])
+    started = start_run(args)
+    cleanup_thread = start_cleanup(args)
 
+    try:
+        if args['cache_dir'] and is_cacheable(args):
+            generate_cached_output(args)
+        else:
+            generate_output(args)
+    except WorkerError as e:
+        error_and_exit(f"{e}, see the error above. Generation stopped.")
+    finally:
+        join_cleanup([cleanup_thread])
+
+    finish_run(args, started)
+
+def is_cacheable(args: dict) -> bool:
     if args['files_count'] == 0:
-        logging.info("Printing generated data to console (files_count = 0)")
-        data = generate_data_lines(args['data_schema'], args['data_lines'])
-        print_data_to_console(data)
+        logging.info("Output streamed to console is not cached")
+        return False
+    if args['seed'] is None:
+        logging.warning("--cache_dir needs a --seed, without one every run generates different data "
+                        "and the output is not cached")
+        return False
+    # Timestamps are never seeded, a cached output would replay the ones of an earlier run.
+    timestamp_keys = [field.key for field in compile_data_schema(args['data_schema'])
+                      if field.kind == FIELD_KIND_TIMESTAMP]
+    if timestamp_keys:
+        logging.warning(f"Timestamp fields ({', '.join(timestamp_keys)}) are not reproducible with a seed, "
+                        "the output is not cached")
+        return False
+    return True
+
+def generate_cached_output(args: dict) -> None:
+    import shutil
+    from capstone.src.output_cache import (build_cache_key, restore_cached_output, create_staging_dir,
+                                           store_cached_output, link_entry_files, evict_cache_entries)
+
+    cache_key = build_cache_key(args)
+    if restore_cached_output(args['cache_dir'], cache_key, args['path_to_save_files']):
+        return
+
+    # The files are generated into the cache and linked to path_to_save_files from there.
+    staging_dir = create_staging_dir(args['cache_dir'])
+    try:
+        generate_output(dict(args, path_to_save_files=staging_dir))
+        entry_path = store_cached_output(args['cache_dir'], cache_key, staging_dir)
+        link_entry_files(entry_path, args['path_to_save_files'])
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    evict_cache_entries(args['cache_dir'], args['cache_size_mb'] * 1024 * 1024)
+
+def generate_output(args: dict) -> None:
+    schema_plan = compile_data_schema(args['data_schema'])
+
+    if args['files_count'] == 0:
+        logging.info("Streaming generated data to console as NDJSON (files_count = 0)")
+        encode_chunk = timed_encoder(compile_chunk_encoder(schema_plan, OUTPUT_FORMAT_JSONL))
+        with measure_write():
+            records_count = stream_data_to_stdout(
+                timed_chunks(iter_data_chunks(schema_plan, args['data_lines'], args['engine'], seed=args['seed'])),
+                encode_chunk)
+        add_output(records_count)
+        return
+
+    context = build_generation_context(args, schema_plan)
+
+    if args['archive'] != ARCHIVE_NONE:
+        generate_archive(context, args['files_count'], args['multiprocessing'], args['files_per_task'])
         return
 
     if args['multiprocessing'] <= 1:
         logging.info("Using single process for file generation")
-        for i in range(1, args['files_count'] + 1):
-            data = generate_data_lines(args['data_schema'], args['data_lines'])
-            unique_filename = generate_unique_file_name(
-                args['path_to_save_files'],
-                args['file_name'],
-                args['file_prefix'],
-                i
-            )
-            file_path = os.path.join(args['path_to_save_files'], unique_filename)
-            save_data_to_file(data, file_path)
+        generate_files(context, range(1, args['files_count'] + 1))
         return
 
-    logging.info(f"Using {args['multiprocessing']} processes for file generation")
+    if args['files_count'] == 1:
+        generate_single_file_in_parallel(context, args['multiprocessing'])
+        return
 
-    file_distribution = distribute_files_across_processes(args['files_count'], args['multiprocessing'])
+    tasks = split_file_indices(args['files_count'], args['files_per_task'])
+    process_count = min(args['multiprocessing'], len(tasks))
+    logging.info(f"Using {process_count} processes for file generation "
+                 f"({len(tasks)} tasks of up to {args['files_per_task']} files)")
 
-    worker_args = []
-    for file_indices in file_distribution:
-        if file_indices:
-            worker_args.append((
-                file_indices,
-                args['path_to_save_files'],
-                args['file_name'],
-                args['file_prefix'],
-                args['data_lines'],
-                args['data_schema'],
-                args['files_count']
-            ))
+    started = time.perf_counter()
 
-    if worker_args:
-        with multiprocessing.Pool(processes=len(worker_args)) as pool:
-            pool.map(worker_generate_files, worker_args)
-            pool.close()
-            pool.join()
+    with create_pool(process_count, init_worker, context) as pool:
+        worker_stats = collect_worker_stats(pool.imap_unordered(worker_generate_files, tasks))
 
-    logging.info(f"Successfully generated {args['files_count']} files using {len(worker_args)} processes")
+    log_worker_utilization(worker_stats, time.perf_counter() - started)
+    logging.info(f"Successfully generated {args['files_count']} files using {process_count} processes")
 
-# Multiprocessing section for generation
+def generate_manifest_jobs(jobs: list[dict], run_args: dict) -> None:
+    started = start_run(run_args)
+    cleanup_threads = [start_cleanup(job) for job in jobs]
 
-def worker_generate_files(args: tuple) -> None:
-    (file_indices, path_to_save_files, base_file_name, file_prefix,
-     data_lines, data_schema, files_count) = args
+    try:
+        generate_jobs_output(jobs, run_args)
+    except WorkerError as e:
+        error_and_exit(f"{e}, see the error above. Generation stopped.")
+    finally:
+        join_cleanup(cleanup_threads)
 
-    for i in file_indices:
-        data = generate_data_lines(data_schema, data_lines)
+    finish_run(run_args, started)
 
-        unique_filename = generate_unique_file_name(
-            path_to_save_files,
-            base_file_name,
-            file_prefix,
-            i
-        )
-        file_path = os.path.join(path_to_save_files, unique_filename)
+def generate_jobs_output(jobs: list[dict], run_args: dict) -> None:
+    contexts = [build_generation_context(job, compile_data_schema(job['data_schema'])) for job in jobs]
+
+    # One task list for every job, largest tasks first, so the small ones fill in
+    # for idle workers at the end instead of a single large file running alone.
+    tasks = [(job_index, file_indices) for job_index, job in enumerate(jobs)
+             for file_indices in split_file_indices(job['files_count'], run_args['files_per_task'])]
+    tasks.sort(key=lambda task: jobs[task[0]]['data_lines'] * len(task[1]), reverse=True)
+    files_count = sum(job['files_count'] for job in jobs)
+
+    process_count = min(run_args['multiprocessing'], len(tasks))
+    if process_count <= 1:
+        logging.info(f"Using single process for {len(jobs)} manifest jobs")
+        for job_index, file_indices in tasks:
+            generate_files(contexts[job_index], file_indices)
+        return
+
+    logging.info(f"Using {process_count} processes for {len(jobs)} manifest jobs "
+                 f"({len(tasks)} tasks of up to {run_args['files_per_task']} files)")
+    started = time.perf_counter()
+
+    with create_pool(process_count, init_manifest_worker, contexts) as pool:
+        worker_stats = collect_worker_stats(pool.imap_unordered(worker_generate_job_files, tasks))
+
+    log_worker_utilization(worker_stats, time.perf_counter() - started)
+    logging.info(f"Successfully generated {files_count} files for {len(jobs)} jobs using {process_count} processes")
+
+def collect_worker_stats(results: Iterable[tuple]) -> dict[int, dict]:
+    worker_stats = {}
+    for pid, files_written, busy_time in collect_worker_metrics(collect_worker_profiles(results)):
+        stats = worker_stats.setdefault(pid, {'files': 0, 'busy_time': 0.0})
+        stats['files'] += files_written
+        stats['busy_time'] += busy_time
+    return worker_stats
+
+# Multiprocessing section for generation
 
-        save_data_to_file(data, file_path)
+def create_pool(process_count: int, initializer: Callable, initarg: Any) -> 'multiprocessing.pool.Pool':
+    # multiprocessing is the slowest import of the CLI, only runs that use a pool pay for it.
+    import multiprocessing
+    return multiprocessing.Pool(processes=process_count, initializer=initializer, initargs=(initarg,))
+
+def imap_bounded(pool: 'multiprocessing.pool.Pool', func: Callable, tasks: Iterable, max_pending: int) -> Iterator:
+    # Like pool.imap, but a task is only submitted once fewer than max_pending results are waiting,
+    # which keeps a slow consumer from holding every finished result in memory.
+    from collections import deque
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+# Run-wide settings are sent once per worker by the pool initializer,
+# so every task only carries its small batch of file indices.
+_worker_context = {}
+
+def init_worker(context: dict) -> None:
+    _worker_context.update(context)
+    # Forked workers inherit the parent's counters and profiler, start them from zero.
+    enable_metrics(context.get('metrics', False))
+    start_profiling(context.get('profile', PROFILE_NONE))
+
+def worker_task(func: Callable) -> Callable:
+    # multiprocessing.Pool only passes Exception subclasses back to the parent, a SystemExit from
+    # error_and_exit would kill the worker and leave the parent waiting for its result forever.
+    # The error has already been logged, the task fails with a WorkerError that the parent can handle.
+    @wraps(func)
+    def run_task(task: Any) -> Any:
+        try:
+            return func(task)
+        except SystemExit as e:
+            raise WorkerError(f"Worker process {os.getpid()} failed with exit code {e.code}") from None
+
+    return run_task
+
+# Every task ends its result with the metrics and the profile collected since
+# the previous task (None when they are disabled).
+
+@worker_task
+def worker_generate_files(file_indices: list[int]) -> tuple[int, int, float, dict | None, dict | None]:
+    started = time.perf_counter()
+    generate_files(_worker_context, file_indices)
+    return (os.getpid(), len(file_indices), time.perf_counter() - started, take_worker_metrics(),
+            take_worker_profile())
+
+# Manifest workers get the contexts of every job once, tasks carry the job index.
+_worker_job_contexts = []
+
+def init_manifest_worker(contexts: list[dict]) -> None:
+    _worker_job_contexts[:] = contexts
+    enable_metrics(contexts[0]['metrics'])
+    start_profiling(contexts[0]['profile'])
+
+@worker_task
+def worker_generate_job_files(task: tuple[int, list[int]]) -> tuple[int, int, float, dict | None, dict | None]:
+    job_index, file_indices = task
+    started = time.perf_counter()
+    generate_files(_worker_job_contexts[job_index], file_indices)
+    return (os.getpid(), len(file_indices), time.perf_counter() - started, take_worker_metrics(),
+            take_worker_profile())
+
+@worker_task
+def worker_generate_archive_members(file_indices: list[int]) -> tuple[list[tuple[int, bytes]], dict | None,
+                                                                    dict | None]:
+    members = [(i, generate_file_content(_worker_context, i)) for i in file_indices]
+    return members, take_worker_metrics(), take_worker_profile()
+
+@worker_task
+def worker_generate_segment(task: tuple[int, int, str]) -> tuple[str, int, dict | None, dict | None]:
+    first_line, rows, segment_path = task
+    schema_plan = _worker_context['schema_plan']
+    output_format = _worker_context['output_format']
+    chunks = iter_data_chunks(schema_plan, rows, _worker_context['engine'], seed=_worker_context['seed'],
+                              file_index=1, first_line=first_line)
+
+    with measure_write():
+        records_count = write_segment(timed_chunks(chunks), segment_path, output_format,
+                                      timed_encoder(compile_chunk_encoder(schema_plan, output_format)),
+                                      _worker_context['compression'])
+    # Segments are temporary, the bytes are counted once the parent has stitched the file.
+    add_output(records_count)
+    return segment_path, records_count, take_worker_metrics(), take_worker_profile()
+
+def generate_single_file_in_parallel(context: dict, process_count: int) -> None:
+    # Workers write encoded (and compressed) row ranges to temporary segment files next to
+    # the target, the parent appends them in order as soon as each one is ready.
+    import shutil
+    import tempfile
+
+    segment_rows = split_data_lines(context['data_lines'], process_count)
+    process_count = min(process_count, len(segment_rows))
+    logging.info(f"Using {process_count} processes to generate one file in {len(segment_rows)} segments")
+
+    unique_filename = generate_unique_file_name(
+        context['path_to_save_files'],
+        context['file_name'],
+        context['file_prefix'],
+        1,
+        get_output_extension(context['output_format'], context['compression']),
+        context['seed']
+    )
+    file_path = os.path.join(context['path_to_save_files'], unique_filename)
+    segments_dir = tempfile.mkdtemp(prefix=f".{context['file_name']}_segments_", dir=context['path_to_save_files'])
+    tasks = [(sum(segment_rows[:i]), rows, os.path.join(segments_dir, f"segment_{i}"))
+             for i, rows in enumerate(segment_rows)]
+
+    try:
+        with create_pool(process_count, init_worker, context) as pool:
+            with measure_write():
+                segments = collect_worker_metrics(collect_worker_profiles(pool.imap(worker_generate_segment, tasks)))
+                stitch_segments(segments, file_path, context['output_format'], context['compression'])
+        add_file_output(file_path, 0)
+    finally:
+        shutil.rmtree(segments_dir, ignore_errors=True)
+
+def split_data_lines(data_lines: int, process_count: int) -> list[int]:
+    # Segments start on a chunk boundary, which keeps seeded output independent of the process count.
+    segment_lines = max(MIN_SEGMENT_LINES, -(-data_lines // (process_count * SEGMENTS_PER_PROCESS)))
+    segment_lines = -(-segment_lines // STREAM_CHUNK_SIZE) * STREAM_CHUNK_SIZE
+    return [min(segment_lines, data_lines - start) for start in range(0, data_lines, segment_lines)]
+
+def split_file_indices(files_count: int, files_per_task: int) -> list[list[int]]:
+    return [list(range(start, min(start + files_per_task, files_count + 1)))
+            for start in range(1, files_count + 1, files_per_task)]
+
+def log_worker_utilization(worker_stats: dict[int, dict], wall_time: float) -> None:
+    for pid, stats in sorted(worker_stats.items()):
+        utilization = stats['busy_time'] / wall_time if wall_time else 0.0
+        logging.info(f"Worker {pid}: {stats['files']} files, busy {stats['busy_time']:.2f}s "
+                     f"of {wall_time:.2f}s ({utilization:.0%} utilization)")
 
 def distribute_files_across_processes(files_count: int, process_count: int) -> list[list[int]]:
     files_per_process = files_count // process_count
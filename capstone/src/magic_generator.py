@@ -2,7 +2,9 @@ import logging
 
 from capstone.src.arguments_validators import validate_all_arguments
 from capstone.src.parser import create_parser
-from capstone.src.generators import generate_and_save_data
+
+# The generation, pool and server modules are imported only by the mode that needs them,
+# which keeps short invocations (e.g. files_count=0 in a script) from paying for all of them.
 
 def main():
     logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -10,7 +12,17 @@ def main():
     parser = create_parser()
     args = parser.parse_args()
     validated_args = validate_all_arguments(args)
-    generate_and_save_data(validated_args)
+
+    if validated_args['serve']:
+        from capstone.src.server import serve
+        serve(validated_args)
+    elif validated_args['manifest']:
+        from capstone.src.generators import generate_manifest_jobs
+        from capstone.src.manifest import load_manifest_jobs
+        generate_manifest_jobs(load_manifest_jobs(validated_args, parser), validated_args)
+    else:
+        from capstone.src.generators import generate_and_save_data
+        generate_and_save_data(validated_args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import argparse
+import configparser
+import json
+import logging
+import os
+
+from capstone.src.arguments_validators import validate_all_arguments
+from capstone.src.constants import ARCHIVE_NONE, MANIFEST_RUN_WIDE_OPTIONS
+from capstone.src.exception_utils import error_and_exit
+from capstone.src.generators import get_output_file_extension
+
+# A manifest lists many generation jobs for one run. Every job goes through the same
+# argparse parser and validators as a command line, so it accepts the same options,
+# values missing from a job come from the manifest defaults and then from default.ini.
+
+def read_json_manifest(manifest_path: str) -> list[tuple[str, dict]]:
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        error_and_exit(f"Failed to load manifest from file '{manifest_path}': {e}")
+
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('jobs'), list) or not manifest['jobs']:
+        error_and_exit(f"Manifest '{manifest_path}' must be a non-empty list of jobs "
+                       "or an object with a non-empty \"jobs\" list")
+
+    defaults = manifest.get('defaults', {})
+    if not isinstance(defaults, dict):
+        error_and_exit(f"\"defaults\" in manifest '{manifest_path}' must be an object")
+
+    jobs = []
+    for i, job in enumerate(manifest['jobs'], 1):
+        if not isinstance(job, dict):
+            error_and_exit(f"Job {i} in manifest '{manifest_path}' must be an object")
+        job = dict(defaults, **job)
+        jobs.append((str(job.pop('name', f"job {i}")), job))
+    return jobs
+
+def read_ini_manifest(manifest_path: str) -> list[tuple[str, dict]]:
+    config = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(manifest_path, 'r') as f:
+            config.read_file(f)
+    except (OSError, configparser.Error) as e:
+        error_and_exit(f"Failed to load manifest from file '{manifest_path}': {e}")
+
+    if not config.sections():
+        error_and_exit(f"Manifest '{manifest_path}' has no job sections")
+    return [(section, dict(config[section])) for section in config.sections()]
+
+def read_manifest(manifest_path: str) -> list[tuple[str, dict]]:
+    if not os.path.isfile(manifest_path):
+        error_and_exit(f"Manifest file not found: {manifest_path}")
+
+    if manifest_path.endswith('.ini'):
+        return read_ini_manifest(manifest_path)
+    return read_json_manifest(manifest_path)
+
+def job_to_argv(name: str, job: dict, parser: argparse.ArgumentParser) -> list[str]:
+    argv = []
+    for key, value in job.items():
+        if isinstance(parser.get_default(key), bool):
+            if isinstance(value, str):
+                value = configparser.ConfigParser.BOOLEAN_STATES.get(value.lower())
+            if not isinstance(value, bool):
+                error_and_exit(f"Option '{key}' in manifest job '{name}' must be true or false")
+            if value:
+                argv.append(f"--{key}")
+            continue
+
+        argv.extend([f"--{key}", value if isinstance(value, str) else json.dumps(value)])
+    return argv
+
+def validate_job(name: str, job: dict, parser: argparse.ArgumentParser, option_names: set[str]) -> dict:
+    unknown_options = sorted(set(job) - option_names)
+    if unknown_options:
+        error_and_exit(f"Unknown options in manifest job '{name}': {', '.join(unknown_options)}")
+
+    run_wide_options = sorted(set(job) & set(MANIFEST_RUN_WIDE_OPTIONS))
+    if run_wide_options:
+        error_and_exit(f"Options {', '.join(run_wide_options)} in manifest job '{name}' apply to the whole run, "
+                       "pass them on the command line instead")
+
+    logging.info(f"Validating manifest job '{name}'")
+    try:
+        namespace = parser.parse_args(job_to_argv(name, job, parser))
+    except SystemExit:
+        error_and_exit(f"Invalid option value in manifest job '{name}', see the message above")
+    validated_job = validate_all_arguments(namespace)
+
+    if validated_job['files_count'] == 0:
+        error_and_exit(f"Manifest job '{name}' has files_count 0, printing to console is not supported for manifests")
+    if validated_job['archive'] != ARCHIVE_NONE:
+        error_and_exit(f"Manifest job '{name}' uses --archive, archives are not supported for manifests")
+    return validated_job
+
+def load_manifest_jobs(run_args: dict, parser: argparse.ArgumentParser) -> list[dict]:
+    if run_args['cache_dir']:
+        error_and_exit("--cache_dir is not supported with --manifest")
+
+    option_names = set(vars(parser.parse_args([])))
+    jobs = []
+    outputs = {}
+
+    for name, job in read_manifest(run_args['manifest']):
+        validated_job = validate_job(name, job, parser, option_names)
+        validated_job.update((option, run_args[option]) for option in MANIFEST_RUN_WIDE_OPTIONS)
+
+        # Two jobs writing the same file names would collide, or clear each other's files.
+        output = (validated_job['path_to_save_files'], validated_job['file_name'],
+                  get_output_file_extension(validated_job))
+        if output in outputs:
+            error_and_exit(f"Manifest jobs '{outputs[output]}' and '{name}' both write {output[1]}*.{output[2]} "
+                           f"files to {output[0]}, use a different file_name")
+        outputs[output] = name
+        jobs.append(validated_job)
+
+    logging.info(f"Manifest '{run_args['manifest']}' with {len(jobs)} jobs is valid")
+    return jobs
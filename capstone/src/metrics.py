@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Run metrics are only collected when --stats or --metrics_file is used, otherwise
+# the hot path is left untouched. Every process keeps its own counters, pool workers
+# send theirs back to the parent with each finished task.
+
+STAGES = ('generation', 'serialization', 'io', 'cleanup')
+# Time the parent spends blocked on pool results, kept apart so it is not counted as I/O.
+WAITING = 'waiting_for_workers'
+
+_lock = threading.Lock()
+_enabled = False
+_counters = {}
+_worker_counters = {}
+_EXHAUSTED = object()
+
+def _new_counters() -> dict:
+    counters = {'records': 0, 'bytes_written': 0, 'files': 0}
+    counters.update((stage, 0.0) for stage in STAGES + (WAITING,))
+    return counters
+
+def enable_metrics(enabled: bool = True) -> None:
+    global _enabled, _counters, _worker_counters
+    _enabled = enabled
+    _counters = _new_counters()
+    _worker_counters = {}
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+def add_time(stage: str, seconds: float) -> None:
+    if _enabled:
+        with _lock:
+            _counters[stage] += seconds
+
+def add_output(records: int, bytes_written: int = 0, files: int = 0) -> None:
+    if _enabled:
+        with _lock:
+            _counters['records'] += records
+            _counters['bytes_written'] += bytes_written
+            _counters['files'] += files
+
+def add_file_output(file_path: str, records: int, files: int = 1) -> None:
+    if _enabled:
+        add_output(records, os.path.getsize(file_path), files)
+
+def stage_total(*stages: str) -> float:
+    return sum(_counters[stage] for stage in stages) if _enabled else 0.0
+
+@contextmanager
+def measure_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(stage, time.perf_counter() - started)
+
+@contextmanager
+def measure_write() -> Iterator[None]:
+    # Writers pull their chunks lazily, so the time spent generating, encoding
+    # and waiting for workers while writing is taken out of the I/O time.
+    started = time.perf_counter()
+    other_stages = ('generation', 'serialization', WAITING)
+    other_before = stage_total(*other_stages)
+    try:
+        yield
+    finally:
+        add_time('io', time.perf_counter() - started - (stage_total(*other_stages) - other_before))
+
+def timed_items(items: Iterable, stage: str) -> Iterator:
+    if not _enabled:
+        yield from items
+        return
+
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        item = next(iterator, _EXHAUSTED)
+        add_time(stage, time.perf_counter() - started)
+        if item is _EXHAUSTED:
+            return
+        yield item
+
+def timed_chunks(chunks: Iterable[list[dict]]) -> Iterator[list[dict]]:
+    return timed_items(chunks, 'generation')
+
+def timed_encoder(encode_chunk: Callable[[list[dict]], str]) -> Callable[[list[dict]], str]:
+    if not _enabled:
+        return encode_chunk
+
+    def encode(chunk: list[dict]) -> str:
+        started = time.perf_counter()
+        encoded = encode_chunk(chunk)
+        add_time('serialization', time.perf_counter() - started)
+        return encoded
+
+    return encode
+
+def peak_rss_bytes(who: int | None = None) -> int | None:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def take_worker_metrics() -> dict | None:
+    global _counters
+    if not _enabled:
+        return None
+
+    with _lock:
+        counters, _counters = _counters, _new_counters()
+    counters['pid'] = os.getpid()
+    counters['peak_rss_bytes'] = peak_rss_bytes()
+    return counters
+
+def merge_worker_metrics(worker_metrics: dict | None) -> None:
+    if not worker_metrics:
+        return
+
+    totals = _worker_counters.setdefault(worker_metrics['pid'], _new_counters())
+    for key, value in worker_metrics.items():
+        if key == 'peak_rss_bytes':
+            totals[key] = max(totals.get(key) or 0, value or 0)
+        elif key != 'pid':
+            totals[key] += value
+
+def collect_worker_metrics(results: Iterable[tuple]) -> Iterator[tuple]:
+    # Pool tasks return their metrics as the last item of the result tuple.
+    for *result, worker_metrics in timed_items(results, WAITING):
+        merge_worker_metrics(worker_metrics)
+        yield tuple(result)
+
+def _summarize(counters: dict, busy_time: float) -> dict:
+    return {'records': counters['records'],
+            'files': counters['files'],
+            'bytes_written': counters['bytes_written'],
+            'stages': {stage: round(counters[stage], 6) for stage in STAGES},
+            'records_per_sec': counters['records'] / busy_time if busy_time else 0.0}
+
+def build_metrics_report(wall_time: float) -> dict:
+    workers = []
+    totals = dict(_counters)
+    for pid, counters in sorted(_worker_counters.items()):
+        busy_time = sum(counters[stage] for stage in STAGES)
+        workers.append(dict(_summarize(counters, busy_time), pid=pid, peak_rss_bytes=counters.get('peak_rss_bytes')))
+        for key in ('records', 'bytes_written', 'files') + STAGES:
+            totals[key] += counters[key]
+
+    peak_rss_values = [peak_rss_bytes()] + [worker['peak_rss_bytes'] for worker in workers]
+    report = _summarize(totals, wall_time)
+    report.update(wall_time=round(wall_time, 6),
+                  waiting_for_workers=round(_counters[WAITING], 6),
+                  peak_rss_bytes=max((value for value in peak_rss_values if value is not None), default=None),
+                  workers=workers)
+    return report
+
+def log_metrics_summary(report: dict) -> None:
+    stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in report['stages'].items())
+    peak_rss = f"{report['peak_rss_bytes'] / 1024 / 1024:.1f} MB" if report['peak_rss_bytes'] else "unknown"
+    logging.info(f"Run metrics: {report['records']} records in {report['files']} files, "
+                 f"{report['bytes_written'] / 1024 / 1024:.2f} MB written in {report['wall_time']:.2f}s "
+                 f"({report['records_per_sec']:.0f} records/s), peak RSS {peak_rss}")
+    logging.info(f"Run time by stage: {stages}")
+    for worker in report['workers']:
+        logging.info(f"Worker {worker['pid']}: {worker['records']} records, "
+                     f"{worker['records_per_sec']:.0f} records/s of busy time")
+
+def write_metrics_file(report: dict, metrics_file: str) -> None:
+    try:
+        with open(metrics_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Run metrics saved to: {metrics_file}")
+    except OSError as e:
+        logging.error(f"Error saving metrics file {metrics_file}: {e}")
+        sys.exit(1)
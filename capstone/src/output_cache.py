@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from capstone.src.constants import CACHE_KEY_VERSION, CACHE_STAGING_PREFIX, FIELD_KIND_FILE_CHOICE
+from capstone.src.exception_utils import error_and_exit
+from capstone.src.schema_plan import compile_data_schema
+
+# Content-addressed cache of generated outputs. With --seed the output only depends on the
+# schema and the options below, so a run is stored under a hash of them in --cache_dir,
+# one directory per run, and a repeat run hardlinks (or copies) the stored files instead of
+# generating them again. Entries are evicted least recently used first above --cache_size_mb.
+
+# Process count, files_per_task and pipeline don't change seeded output, they are not part of the key.
+CACHE_KEY_OPTIONS = ('data_lines', 'files_count', 'file_name', 'file_prefix', 'engine', 'output_format',
+                     'compression', 'archive', 'seed')
+
+def build_cache_key(args: dict) -> str:
+    # The schema is normalized through its compiled plan, so spelling differences
+    # like "int: rand(1,5)" and "int:rand(1, 5)" share one entry. Key order is kept, it is part of the output.
+    # Value files are keyed by their content, an edited file invalidates the entry.
+    schema = [[field.key, field.kind,
+               field.argument.digest() if field.kind == FIELD_KIND_FILE_CHOICE else field.argument]
+              for field in compile_data_schema(args['data_schema'])]
+    key = {'version': CACHE_KEY_VERSION, 'schema': schema}
+    key.update((option, args[option]) for option in CACHE_KEY_OPTIONS)
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def get_entry_path(cache_dir: str, cache_key: str) -> str:
+    return os.path.join(cache_dir, cache_key)
+
+def get_entry_size(entry_path: str) -> int:
+    return sum(os.path.getsize(os.path.join(entry_path, name)) for name in os.listdir(entry_path))
+
+def link_entry_files(entry_path: str, path_to_save_files: str) -> int:
+    names = sorted(os.listdir(entry_path))
+    # Every target is checked before anything is linked, so a conflict leaves no partial output behind.
+    for name in names:
+        if os.path.lexists(os.path.join(path_to_save_files, name)):
+            error_and_exit(f"File already exists: {os.path.join(path_to_save_files, name)}. "
+                           "Use --clear_path to remove previously generated files.")
+
+    for name in names:
+        source, target = os.path.join(entry_path, name), os.path.join(path_to_save_files, name)
+        try:
+            os.link(source, target)
+        except OSError:
+            # Different filesystem, or one without hardlinks.
+            shutil.copyfile(source, target)
+    return len(names)
+
+def restore_cached_output(cache_dir: str, cache_key: str, path_to_save_files: str) -> bool:
+    entry_path = get_entry_path(cache_dir, cache_key)
+    if not os.path.isdir(entry_path):
+        return False
+
+    # The entry's modification time is its last use, which is what eviction goes by.
+    os.utime(entry_path)
+    files_count = link_entry_files(entry_path, path_to_save_files)
+    logging.info(f"Reused {files_count} cached files from {entry_path}")
+    return True
+
+def create_staging_dir(cache_dir: str) -> str:
+    return tempfile.mkdtemp(prefix=CACHE_STAGING_PREFIX, dir=cache_dir)
+
+def store_cached_output(cache_dir: str, cache_key: str, staging_dir: str) -> str:
+    entry_path = get_entry_path(cache_dir, cache_key)
+    try:
+        # Renaming the finished directory publishes the entry atomically, a concurrent run
+        # either sees the whole entry or none of it.
+        os.rename(staging_dir, entry_path)
+    except OSError:
+        logging.warning(f"Cache entry {entry_path} was stored by another run, keeping that one")
+        return staging_dir
+    logging.info(f"Stored generated files in cache entry {entry_path}")
+    return entry_path
+
+def evict_cache_entries(cache_dir: str, max_bytes: int) -> None:
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_path = os.path.join(cache_dir, name)
+        if name.startswith(CACHE_STAGING_PREFIX) or not os.path.isdir(entry_path):
+            continue
+        entries.append((os.path.getmtime(entry_path), get_entry_size(entry_path), entry_path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_size -= size
+        logging.info(f"Evicted cache entry {entry_path} ({size} bytes)")
@@ -16,7 +16,8 @@ def create_parser() -> argparse.ArgumentParser:
                         default=defaults['files_count'],
                         type=int,
                         help='How many JSON files to generate. '
-                        'Count must be greater or equal to 0. If equal to 0 the output will be printed to console.')
+                        'Count must be greater or equal to 0. If equal to 0 the records are streamed to stdout '
+                        'as NDJSON, one compact JSON object per line.')
     parser.add_argument('--file_name',
                         default=defaults['file_name'],
                         help='Base file_name. If there is no prefix, the final file name will be file_name.json. '
@@ -26,16 +27,17 @@ def create_parser() -> argparse.ArgumentParser:
                         choices=['count', 'random', 'uuid'],
                         help='What prefix for file name to use if more than 1 file needs to be generated')
     parser.add_argument('--data_schema',
-                        required=True,
                         type=str,
                         help=(
-                            "JSON schema as a string. Can be provided in two ways:\n"
+                            "JSON schema as a string, required unless --manifest or --serve is used. "
+                            "Can be provided in two ways:\n"
                             "1) Path to a JSON file: e.g., './schema.json'\n"
                             "2) Inline JSON string: e.g., "
                             "'{\"name\": \"str:rand\", \"age\": \"int:rand(1, 100)\", \"type\": \"str:['client','partner']\"}'\n\n"
                             "All values must follow the pattern type:instruction.\n\n"
                             "Supported types: str, int, timestamp.\n"
-                            "Instructions include: rand, rand(from, to), list values, fixed value, or empty.\n\n"
+                            "Instructions include: rand, rand(from, to), list values, fixed value, or empty.\n"
+                            "str:@file:names.txt picks values from a text file with one value per line.\n\n"
                             "The only exception is timestamp that doesn't support any values for the instruction part."
                             " Proper usage for timestamp: (timestamp:)")
                         )
@@ -48,11 +50,113 @@ def create_parser() -> argparse.ArgumentParser:
                         action='store_true',
                         help='If this flag is on, before the script starts creating new data files, '
                              'all files in path_to_save_files that match file_name will be deleted.')
+    parser.add_argument('--clear_mode',
+                        default=defaults['clear_mode'],
+                        choices=['sync', 'background'],
+                        help='How --clear_path removes files. "sync" deletes them with parallel threads before '
+                             'generation starts,\n"background" moves them to a hidden directory and deletes it '
+                             'while the new files are generated.')
     parser.add_argument('--multiprocessing',
                         default=defaults['multiprocessing'],
                         type=int,
                         help='The number of processes used to create files. '
-                             'Divides the “files_count” value equally and starts N processes '
-                             'to create an equal number of files in parallel.')
+                             'Starts N processes that take batches of “files_count” files '
+                             'on demand and create them in parallel.')
+    parser.add_argument('--engine',
+                        default=defaults['engine'],
+                        choices=['record', 'batch'],
+                        help='Generation engine. "record" builds one record at a time, '
+                             '"batch" generates every schema column as a whole block, '
+                             'which is much faster for large data_lines values.')
+    parser.add_argument('--output_format',
+                        default=defaults['output_format'],
+                        choices=['json', 'json-compact', 'jsonl'],
+                        help='Format of generated files. "json" is an indented JSON array, '
+                             '"json-compact" is a JSON array without whitespace,\n'
+                             '"jsonl" writes one compact record per line to a .jsonl file.')
+    parser.add_argument('--compression',
+                        default=defaults['compression'],
+                        choices=['none', 'gzip', 'bz2', 'lzma'],
+                        help='Compress generated files while they are written (.gz, .bz2 or .xz suffix). '
+                             'A single file generated with --multiprocessing is compressed\n'
+                             'in parallel, one independent stream per segment.')
+    parser.add_argument('--archive',
+                        default=defaults['archive'],
+                        choices=['none', 'tar', 'zip'],
+                        help='Pack all generated files as members of a single streamed archive '
+                             '(file_name.tar or file_name.zip) instead of separate files.\n'
+                             'With an archive --compression compresses the archive itself.')
+    parser.add_argument('--files_per_task',
+                        default=defaults['files_per_task'],
+                        type=int,
+                        help='How many file indices a worker process takes at a time when multiprocessing. '
+                             'Workers request a new batch as soon as they finish the previous one, '
+                             'smaller values balance the load better.')
+    parser.add_argument('--pipeline',
+                        default=defaults['pipeline'],
+                        action='store_true',
+                        help='If this flag is on, records are generated and serialized while a dedicated '
+                             'writer thread flushes the previous chunks to disk.\n'
+                             'Per-stage timings are logged at the end of the run.')
+    parser.add_argument('--seed',
+                        default=defaults['seed'],
+                        type=int,
+                        help='Seed for reproducible output. Every file gets its own random streams derived from the '
+                             'seed and the file index,\nso the same files are generated whatever the '
+                             '--multiprocessing value. Timestamps are not reproducible.\n'
+                             'With --file_prefix random the file index picks a distinct number, so names never collide.')
+    parser.add_argument('--cache_dir',
+                        default=defaults['cache_dir'],
+                        help='Directory of a cache of generated outputs, used together with --seed. A run with the '
+                             'same schema, seed and file options\nas a cached one hardlinks (or copies) the cached '
+                             'files instead of generating them. Hardlinked files share their data with the cache,\n'
+                             'don\'t edit them in place. Schemas with timestamp fields are not cached.\n'
+                             'Empty value means no cache.')
+    parser.add_argument('--cache_size_mb',
+                        default=defaults['cache_size_mb'],
+                        type=int,
+                        help='Maximum size of --cache_dir in megabytes, the least recently used outputs are '
+                             'removed above it.')
+    parser.add_argument('--stats',
+                        default=defaults['stats'],
+                        action='store_true',
+                        help='If this flag is on, a summary of the run is logged on exit: records and bytes written, '
+                             'time spent on generation, serialization, I/O and cleanup, records per second '
+                             'and peak memory, overall and per worker process.')
+    parser.add_argument('--metrics_file',
+                        default=defaults['metrics_file'],
+                        help='Path of a JSON file to save the run metrics to (the same figures as --stats).\n'
+                             'Empty value means no metrics file.')
+    parser.add_argument('--profile',
+                        default=defaults['profile'],
+                        choices=['none', 'cpu', 'memory'],
+                        help='Profile the run with cProfile (cpu) or tracemalloc (memory), in the main process '
+                             'and in every worker process.\n'
+                             'One merged report with the top functions or allocation sites is logged on exit.')
+    parser.add_argument('--serve',
+                        default=defaults['serve'],
+                        action='store_true',
+                        help='Start a local HTTP server instead of generating files. '
+                             'POST /generate streams NDJSON records with chunked transfer encoding.\n'
+                             'The request body is a JSON object with optional "data_schema" and "data_lines", '
+                             'missing values are taken from --data_schema and --data_lines.\n'
+                             'Posted schemas can\'t use @file: value lists, only --data_schema can.\n'
+                             'With --multiprocessing greater than 1 the records are generated by a pool that '
+                             'stays warm between requests.')
+    parser.add_argument('--serve_host',
+                        default=defaults['serve_host'],
+                        help='Address the --serve server listens on.')
+    parser.add_argument('--serve_port',
+                        default=defaults['serve_port'],
+                        type=int,
+                        help='Port the --serve server listens on, 0 picks a free port.')
+    parser.add_argument('--manifest',
+                        help='Path to a JSON or INI manifest listing many generation jobs. Every job is validated '
+                             'before anything is generated, then all jobs run on one shared worker pool.\n'
+                             'JSON: {"defaults": {...}, "jobs": [{"file_name": "users", "data_schema": {...}}, ...]}\n'
+                             'INI: one section per job, [DEFAULT] holds values shared by all jobs.\n'
+                             'Jobs accept the file options of this command, --multiprocessing, --files_per_task, '
+                             '--stats, --metrics_file and --profile apply to the whole run.\n'
+                             '--cache_dir is not supported with a manifest.')
 
     return parser
\ No newline at end of file
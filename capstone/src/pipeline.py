@@ -0,0 +1,113 @@
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Iterator
+
+from capstone.src.constants import PIPELINE_QUEUE_SIZE, COMPRESSION_NONE
+from capstone.src.file_utils import OUTPUT_FRAMES, ChunkEncoder, open_output_file
+from capstone.src.metrics import add_file_output, add_time
+
+# Producer/consumer pipeline: the calling thread generates and encodes chunks
+# while a writer thread flushes them to disk. The bounded queue is the backpressure,
+# at most PIPELINE_QUEUE_SIZE encoded chunks are held in memory at a time.
+
+_OPEN, _WRITE, _CLOSE = 'open', 'write', 'close'
+_STOP = None
+
+def _write_from_queue(write_queue: queue.Queue, compression: str, timings: dict, errors: list) -> None:
+    f = None
+    file_path = None
+    records_count = 0
+
+    while True:
+        started = time.perf_counter()
+        item = write_queue.get()
+        timings['writer_idle'] += time.perf_counter() - started
+
+        if item is _STOP:
+            return
+        if errors:
+            continue
+
+        started = time.perf_counter()
+        try:
+            action, payload, records = item
+            if action == _OPEN:
+                file_path, records_count = payload, 0
+                f = open_output_file(file_path, 'w', compression)
+            elif action == _WRITE:
+                f.write(payload)
+                records_count += records
+            else:
+                f.close()
+                add_file_output(file_path, records_count)
+                logging.info(f"Successfully saved {records_count} records to: {file_path}")
+        except OSError as e:
+            errors.append(f"Error saving data to file {file_path}: {e}")
+            if f is not None:
+                f.close()
+        timings['write'] += time.perf_counter() - started
+
+def _put(write_queue: queue.Queue, item: tuple, timings: dict) -> None:
+    started = time.perf_counter()
+    write_queue.put(item)
+    timings['producer_blocked'] += time.perf_counter() - started
+
+def _produce_file(write_queue: queue.Queue, file_path: str, chunks: Iterator[list[dict]],
+                  output_format: str, encode_chunk: ChunkEncoder, timings: dict) -> None:
+    opening, separator, closing, empty = OUTPUT_FRAMES[output_format]
+    _put(write_queue, (_OPEN, file_path, 0), timings)
+
+    records_count = 0
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        timings['generation'] += time.perf_counter() - started
+        if chunk is None:
+            break
+        if not chunk:
+            continue
+
+        started = time.perf_counter()
+        text = (separator if records_count else opening) + encode_chunk(chunk)
+        timings['serialization'] += time.perf_counter() - started
+
+        _put(write_queue, (_WRITE, text, len(chunk)), timings)
+        records_count += len(chunk)
+
+    _put(write_queue, (_WRITE, closing if records_count else empty, 0), timings)
+    _put(write_queue, (_CLOSE, None, 0), timings)
+
+def run_write_pipeline(file_jobs: Iterable[tuple[str, Iterator[list[dict]]]], output_format: str,
+                       encode_chunk: ChunkEncoder, compression: str = COMPRESSION_NONE,
+                       queue_size: int = PIPELINE_QUEUE_SIZE) -> dict:
+    timings = {'generation': 0.0, 'serialization': 0.0, 'producer_blocked': 0.0, 'write': 0.0, 'writer_idle': 0.0}
+    errors = []
+    write_queue = queue.Queue(maxsize=queue_size)
+    writer = threading.Thread(target=_write_from_queue, args=(write_queue, compression, timings, errors), daemon=True)
+    writer.start()
+
+    try:
+        for file_path, chunks in file_jobs:
+            if errors:
+                break
+            _produce_file(write_queue, file_path, chunks, output_format, encode_chunk, timings)
+    finally:
+        write_queue.put(_STOP)
+        writer.join()
+
+    if errors:
+        logging.error(errors[0])
+        sys.exit(1)
+
+    add_time('generation', timings['generation'])
+    add_time('serialization', timings['serialization'])
+    add_time('io', timings['write'])
+
+    logging.info(f"Pipeline stage timings: generation {timings['generation']:.2f}s, "
+                 f"serialization {timings['serialization']:.2f}s, "
+                 f"producer blocked {timings['producer_blocked']:.2f}s, "
+                 f"write {timings['write']:.2f}s, writer idle {timings['writer_idle']:.2f}s")
+    return timings
@@ -0,0 +1,141 @@
+import io
+import logging
+import os
+from typing import Iterable, Iterator
+
+from capstone.src.constants import (PROFILE_NONE, PROFILE_CPU, PROFILE_MEMORY, PROFILE_TOP_ENTRIES,
+                                    PROFILE_SNAPSHOT_GROWTH)
+
+# --profile runs cProfile or tracemalloc in the parent and in every pool worker.
+# Workers return a picklable profile with each task, the parent merges them into one report.
+# The profilers are imported only when a profile is requested, to keep the CLI startup short.
+
+_mode = PROFILE_NONE
+_profiler = None
+_peak_snapshot = None
+_peak_snapshot_size = 0
+_worker_profiles = []
+
+
+class _RawStats:
+    # pstats.Stats loads any object with a create_stats() method and a stats dict,
+    # which lets profiles collected in other processes be merged.
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def start_profiling(mode: str) -> None:
+    global _mode, _profiler, _peak_snapshot, _peak_snapshot_size, _worker_profiles
+    # Forked workers inherit the parent's profiler, so whatever is running is reset first.
+    if _profiler is not None:
+        _profiler.disable()
+    if _mode == PROFILE_MEMORY:
+        import tracemalloc
+        tracemalloc.stop()
+
+    _mode, _profiler, _peak_snapshot, _peak_snapshot_size, _worker_profiles = mode, None, None, 0, []
+    if mode == PROFILE_CPU:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    elif mode == PROFILE_MEMORY:
+        import tracemalloc
+        tracemalloc.start()
+
+
+def sample_memory_peak() -> None:
+    # Called once per generated chunk, a snapshot is only taken when the traced memory
+    # has grown noticeably since the previous one, so the report shows the sites at the peak.
+    global _peak_snapshot, _peak_snapshot_size
+    if _mode != PROFILE_MEMORY:
+        return
+
+    import tracemalloc
+    current = tracemalloc.get_traced_memory()[0]
+    if current > _peak_snapshot_size * PROFILE_SNAPSHOT_GROWTH:
+        _peak_snapshot = tracemalloc.take_snapshot()
+        _peak_snapshot_size = current
+
+
+def stop_profiling() -> dict | None:
+    global _mode, _profiler
+    if _mode == PROFILE_CPU:
+        _profiler.disable()
+        _profiler.create_stats()
+        profile = {'pid': os.getpid(), 'cpu_stats': _profiler.stats}
+    elif _mode == PROFILE_MEMORY:
+        import tracemalloc
+        sample_memory_peak()
+        snapshot = (_peak_snapshot or tracemalloc.take_snapshot()).filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        profile = {'pid': os.getpid(),
+                   'peak_memory': tracemalloc.get_traced_memory()[1],
+                   'allocation_sites': [(str(statistic.traceback), statistic.size, statistic.count)
+                                        for statistic in snapshot.statistics('lineno')]}
+        tracemalloc.stop()
+    else:
+        return None
+
+    _mode, _profiler = PROFILE_NONE, None
+    return profile
+
+
+def take_worker_profile() -> dict | None:
+    mode = _mode
+    profile = stop_profiling()
+    start_profiling(mode)
+    return profile
+
+
+def collect_worker_profiles(results: Iterable[tuple]) -> Iterator[tuple]:
+    # Pool tasks return their profile as the last item of the result tuple.
+    for *result, worker_profile in results:
+        if worker_profile is not None:
+            _worker_profiles.append(worker_profile)
+        yield tuple(result)
+
+
+def _format_cpu_report(profiles: list[dict]) -> str:
+    import pstats
+    stats = pstats.Stats(_RawStats(profiles[0]['cpu_stats']), stream=io.StringIO())
+    for profile in profiles[1:]:
+        stats.add(_RawStats(profile['cpu_stats']))
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_ENTRIES)
+    return stats.stream.getvalue()
+
+
+def _format_memory_report(profiles: list[dict]) -> str:
+    sites = {}
+    peaks = {}
+    for profile in profiles:
+        peaks[profile['pid']] = max(peaks.get(profile['pid'], 0), profile['peak_memory'])
+        for site, size, count in profile['allocation_sites']:
+            total_size, total_count = sites.get(site, (0, 0))
+            sites[site] = (total_size + size, total_count + count)
+
+    lines = [f"Peak traced memory of process {pid}: {peak / 1024:.1f} KiB" for pid, peak in peaks.items()]
+    lines.append(f"Top {PROFILE_TOP_ENTRIES} allocation sites at the peak:")
+    top_sites = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:PROFILE_TOP_ENTRIES]
+    lines.extend(f"{size / 1024:10.1f} KiB {count:8} blocks  {site}" for site, (size, count) in top_sites)
+    return '\n'.join(lines)
+
+
+def build_profile_report(parent_profile: dict | None) -> str | None:
+    profiles = ([parent_profile] if parent_profile else []) + _worker_profiles
+    if not profiles:
+        return None
+
+    processes = len({profile['pid'] for profile in profiles})
+    header = f"Profile merged from {processes} processes:\n"
+    if 'cpu_stats' in profiles[0]:
+        return header + _format_cpu_report(profiles)
+    return header + _format_memory_report(profiles)
+
+
+def log_profile_report(parent_profile: dict | None) -> None:
+    report = build_profile_report(parent_profile)
+    if report:
+        logging.info(report)
@@ -0,0 +1,98 @@
+import json
+from operator import itemgetter
+from typing import Any, Callable
+
+from capstone.src.constants import (FIELD_KIND_TIMESTAMP, FIELD_KIND_UUID, FIELD_KIND_RAND_INT,
+                                    FIELD_KIND_CHOICE, FIELD_KIND_CONSTANT, FIELD_KIND_FILE_CHOICE, OUTPUT_FORMAT_JSON,
+                                    OUTPUT_FORMAT_JSON_COMPACT, OUTPUT_FORMAT_JSONL)
+from capstone.src.file_utils import ChunkEncoder
+from capstone.src.schema_plan import CompiledField
+
+# Every row generated from a plan has the same fields in the same order, so the
+# record is rendered from a %-template where keys and constant values are encoded once.
+# Output matches the json.dumps based encoders in file_utils byte for byte.
+
+# (record opening, field separator, key separator, record closing, record separator)
+RECORD_LAYOUTS = {
+    OUTPUT_FORMAT_JSON: ('  {\n    ', ',\n    ', ': ', '\n  }', ',\n'),
+    OUTPUT_FORMAT_JSON_COMPACT: ('{', ',', ':', '}', ','),
+    OUTPUT_FORMAT_JSONL: ('{', ',', ':', '}\n', '')
+}
+
+# UUID strings only contain hex digits and dashes, so they never need escaping.
+VALUE_SLOTS = {
+    FIELD_KIND_TIMESTAMP: '%r',
+    FIELD_KIND_UUID: '"%s"',
+    FIELD_KIND_RAND_INT: '%d',
+    FIELD_KIND_FILE_CHOICE: '"%s"'
+}
+
+def _escape_template(text: str) -> str:
+    return text.replace('%', '%%')
+
+def _needs_rendering(field: CompiledField) -> bool:
+    # List options are written raw into the slot unless json.dumps would escape them.
+    if field.kind == FIELD_KIND_FILE_CHOICE:
+        return field.argument.needs_escaping
+    if field.kind != FIELD_KIND_CHOICE:
+        return False
+    return not all(type(item) is int or json.dumps(item) == f'"{item}"' for item in field.argument)
+
+def _value_slot(field: CompiledField) -> str:
+    if _needs_rendering(field):
+        return '%s'
+    if field.kind != FIELD_KIND_CHOICE:
+        return VALUE_SLOTS[field.kind]
+    return '%d' if all(type(item) is int for item in field.argument) else '"%s"'
+
+def _render_field(field: CompiledField, key_separator: str) -> str:
+    rendered_key = _escape_template(json.dumps(field.key))
+
+    if field.kind == FIELD_KIND_CONSTANT:
+        return f"{rendered_key}{key_separator}{_escape_template(json.dumps(field.argument))}"
+
+    return f"{rendered_key}{key_separator}{_value_slot(field)}"
+
+def _value_renderer(field: CompiledField) -> Callable[[Any], str] | None:
+    if not _needs_rendering(field):
+        return None
+    # True == 1, so lists mixing bools and ints can't share one lookup dict.
+    if field.kind == FIELD_KIND_FILE_CHOICE or any(isinstance(item, bool) for item in field.argument):
+        return json.dumps
+    return {item: json.dumps(item) for item in field.argument}.__getitem__
+
+def _build_values_getter(schema_plan: list[CompiledField]) -> Callable[[tuple], tuple] | None:
+    # Rows hold the values in plan order, constants are already part of the template.
+    positions = [i for i, field in enumerate(schema_plan) if field.kind != FIELD_KIND_CONSTANT]
+    renderers = [_value_renderer(schema_plan[i]) for i in positions]
+
+    if len(positions) == len(schema_plan) and not any(renderers):
+        return None
+    get_values = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+    if not any(renderers):
+        return get_values
+
+    def get_rendered_values(row: tuple) -> tuple:
+        return tuple([value if render is None else render(value)
+                      for render, value in zip(renderers, get_values(row))])
+
+    return get_rendered_values
+
+def compile_chunk_encoder(schema_plan: list[CompiledField], output_format: str) -> ChunkEncoder:
+    record_opening, field_separator, key_separator, record_closing, record_separator = RECORD_LAYOUTS[output_format]
+    template = (record_opening
+                + field_separator.join(_render_field(field, key_separator) for field in schema_plan)
+                + record_closing)
+
+    if all(field.kind == FIELD_KIND_CONSTANT for field in schema_plan):
+        rendered_record = template % ()
+        return lambda chunk: record_separator.join([rendered_record] * len(chunk))
+
+    get_values = _build_values_getter(schema_plan)
+    if get_values is None:
+        return lambda chunk: record_separator.join([template % row for row in chunk])
+
+    def encode_chunk(chunk: list[tuple]) -> str:
+        return record_separator.join([template % get_values(row) for row in chunk])
+
+    return encode_chunk
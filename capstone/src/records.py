@@ -0,0 +1,45 @@
+import json
+import random
+from typing import Iterator
+
+from capstone.src.batch_generators import generate_data_batch
+from capstone.src.constants import STREAM_CHUNK_SIZE
+from capstone.src.data_schema import check_data_schema
+from capstone.src.schema_plan import CompiledField, compile_data_schema
+
+# In-process API: records are generated lazily from the compiled schema with the batch engine,
+# without going through argparse, JSON encoding or files.
+#
+#     from capstone.src.records import iter_records
+#     for record in iter_records({"name": "str:rand", "age": "int:rand(1, 90)"}, 1_000_000, seed=42):
+#         ...
+
+def compile_record_schema(data_schema: dict[str, str] | str) -> list[CompiledField]:
+    # The CLI logs a schema problem and exits, a library caller gets it as a ValueError (SchemaError).
+    if isinstance(data_schema, str):
+        try:
+            data_schema = json.loads(data_schema)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Data schema is not valid JSON: {e}") from e
+
+    check_data_schema(data_schema)
+    return compile_data_schema(data_schema)
+
+def iter_record_batches(data_schema: dict[str, str] | str, data_lines: int, seed: int | None = None,
+                        batch_size: int = STREAM_CHUNK_SIZE) -> Iterator[list[dict]]:
+    if data_lines < 0:
+        raise ValueError(f"data_lines can't be a negative number: {data_lines}")
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be a positive number: {batch_size}")
+
+    # The schema is checked right away, only the records themselves are generated lazily.
+    schema_plan = compile_record_schema(data_schema)
+    rng = random.Random(seed) if seed is not None else None
+    return (generate_data_batch(schema_plan, min(batch_size, data_lines - start), rng)
+            for start in range(0, data_lines, batch_size))
+
+def iter_records(data_schema: dict[str, str] | str, data_lines: int, seed: int | None = None,
+                 batch_size: int = STREAM_CHUNK_SIZE) -> Iterator[dict]:
+    # With a seed the same records are generated on every call, timestamps excepted.
+    batches = iter_record_batches(data_schema, data_lines, seed, batch_size)
+    return (record for batch in batches for record in batch)
@@ -0,0 +1,89 @@
+import time
+import uuid
+import random
+import json
+from functools import partial
+from typing import Any, Callable, NamedTuple
+
+from capstone.src.constants import (FIELD_KIND_TIMESTAMP, FIELD_KIND_UUID, FIELD_KIND_RAND_INT,
+                                    FIELD_KIND_CHOICE, FIELD_KIND_CONSTANT, FIELD_KIND_FILE_CHOICE,
+                                    RAND_INT_DEFAULT_RANGE, FILE_INSTRUCTION_PREFIX)
+from capstone.src.uuid_strings import next_uuid_string
+from capstone.src.value_lists import ValueList, load_value_list
+
+# Field generators are module level functions wrapped in functools.partial,
+# so the compiled plan can be pickled and sent to multiprocessing workers.
+# Generated rows are tuples of values in plan order, the plan itself is the key header,
+# and rows are turned into dicts only where records are handed to a caller.
+
+class CompiledField(NamedTuple):
+    key: str
+    kind: str
+    argument: Any
+    generate: Callable[..., Any]
+
+
+# Every generator takes an optional seeded random.Random, without one the global
+# random state (and os.urandom for UUIDs) is used. Timestamps are never seeded.
+
+def _generate_timestamp(rng: random.Random | None = None) -> float:
+    return time.time()
+
+def _generate_uuid(rng: random.Random | None = None) -> str:
+    if rng is None:
+        return next_uuid_string()
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _generate_random_int(lower_bound: int, upper_bound: int, rng: random.Random | None = None) -> int:
+    return (rng or random).randint(lower_bound, upper_bound)
+
+def _generate_choice(items: list, rng: random.Random | None = None) -> Any:
+    return (rng or random).choice(items)
+
+def _generate_file_choice(value_list: ValueList, rng: random.Random | None = None) -> str:
+    return value_list.choice(rng)
+
+def _generate_constant(value: Any, rng: random.Random | None = None) -> Any:
+    return value
+
+def compile_schema_field(key: str, raw_value: str) -> CompiledField:
+    type_part, instruction_part = (part.strip() for part in raw_value.split(":", 1))
+
+    if type_part == "timestamp":
+        return CompiledField(key, FIELD_KIND_TIMESTAMP, None, _generate_timestamp)
+
+    if instruction_part == "":
+        value = "" if type_part == "str" else None
+        return CompiledField(key, FIELD_KIND_CONSTANT, value, partial(_generate_constant, value))
+
+    if instruction_part == "rand":
+        if type_part == "str":
+            return CompiledField(key, FIELD_KIND_UUID, None, _generate_uuid)
+        return CompiledField(key, FIELD_KIND_RAND_INT, RAND_INT_DEFAULT_RANGE,
+                             partial(_generate_random_int, *RAND_INT_DEFAULT_RANGE))
+
+    if instruction_part.startswith("rand(") and instruction_part.endswith(")"):
+        lower_str, upper_str = (s.strip() for s in instruction_part[5:-1].split(",", 1))
+        bounds = (int(lower_str), int(upper_str))
+        return CompiledField(key, FIELD_KIND_RAND_INT, bounds, partial(_generate_random_int, *bounds))
+
+    if instruction_part.startswith("[") and instruction_part.endswith("]"):
+        items = json.loads(instruction_part.replace("'", '"'))
+        return CompiledField(key, FIELD_KIND_CHOICE, items, partial(_generate_choice, items))
+
+    if instruction_part.startswith(FILE_INSTRUCTION_PREFIX):
+        value_list = load_value_list(instruction_part[len(FILE_INSTRUCTION_PREFIX):].strip())
+        return CompiledField(key, FIELD_KIND_FILE_CHOICE, value_list, partial(_generate_file_choice, value_list))
+
+    value = instruction_part if type_part == "str" else int(instruction_part)
+    return CompiledField(key, FIELD_KIND_CONSTANT, value, partial(_generate_constant, value))
+
+def compile_data_schema(data_schema: dict[str, str]) -> list[CompiledField]:
+    return [compile_schema_field(key, raw_value) for key, raw_value in data_schema.items()]
+
+def generate_record_from_plan(schema_plan: list[CompiledField], rng: random.Random | None = None) -> dict:
+    return {field.key: field.generate(rng) for field in schema_plan}
+
+def records_from_rows(schema_plan: list[CompiledField], rows: list[tuple]) -> list[dict]:
+    keys = [field.key for field in schema_plan]
+    return [dict(zip(keys, row)) for row in rows]
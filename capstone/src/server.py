@@ -0,0 +1,165 @@
+import json
+import logging
+import multiprocessing
+import sys
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.pool import Pool
+from typing import Iterator
+
+from capstone.src.constants import (OUTPUT_FORMAT_JSONL, SERVE_BLOCK_LINES, SERVE_PENDING_BLOCKS_PER_PROCESS,
+                                    SCHEMA_CACHE_SIZE, MAX_REQUEST_BODY_SIZE)
+from capstone.src.data_schema import get_value_file_paths
+from capstone.src.file_utils import ChunkEncoder
+from capstone.src.generators import imap_bounded, iter_data_chunks
+from capstone.src.record_encoder import compile_chunk_encoder
+from capstone.src.records import compile_record_schema
+from capstone.src.schema_plan import CompiledField
+from capstone.src.value_lists import value_file_version
+
+# --serve mode: a local HTTP server that streams NDJSON records for a posted schema.
+# The worker pool is started once and reused by every request, and every process
+# keeps the compiled plans of recently used schemas, keyed by the schema's JSON text
+# and the versions of the value files it reads.
+# Only the server's own --data_schema may use @file: value lists, a posted schema
+# must not be able to read files from the host.
+#
+#     curl -N -d '{"data_schema": {"age": "int:rand(1, 90)"}, "data_lines": 1000000}' localhost:8080/generate
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def compile_cached_schema(schema_json: str, value_files: tuple = ()) -> tuple[list[CompiledField], ChunkEncoder]:
+    schema_plan = compile_record_schema(schema_json)
+    return schema_plan, compile_chunk_encoder(schema_plan, OUTPUT_FORMAT_JSONL)
+
+def get_compiled_schema(schema_json: str) -> tuple[list[CompiledField], ChunkEncoder]:
+    # An edited value file changes the cache key, so the plan is compiled again with the new file.
+    value_files = tuple(value_file_version(path) for path in get_value_file_paths(json.loads(schema_json)))
+    return compile_cached_schema(schema_json, value_files)
+
+def encode_block(task: tuple[str, int, str]) -> bytes:
+    schema_json, rows, engine = task
+    schema_plan, encode_chunk = get_compiled_schema(schema_json)
+    return ''.join([encode_chunk(chunk) for chunk in iter_data_chunks(schema_plan, rows, engine)]).encode()
+
+def iter_encoded_blocks(pool: Pool | None, schema_json: str, data_lines: int, engine: str,
+                        max_pending: int = SERVE_PENDING_BLOCKS_PER_PROCESS) -> Iterator[bytes]:
+    tasks = ((schema_json, min(SERVE_BLOCK_LINES, data_lines - start), engine)
+             for start in range(0, data_lines, SERVE_BLOCK_LINES))
+    if pool is None:
+        return map(encode_block, tasks)
+
+    # Blocks are only submitted a few at a time ahead of the client,
+    # so a slow reader never makes the server hold the whole response.
+    return imap_bounded(pool, encode_block, tasks, max_pending)
+
+
+class GenerateRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        else:
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != '/generate':
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        try:
+            schema_json, data_lines = self.read_generate_request()
+            get_compiled_schema(schema_json)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        try:
+            blocks = iter_encoded_blocks(self.server.pool, schema_json, data_lines, self.server.args['engine'],
+                                         self.server.args['multiprocessing'] * SERVE_PENDING_BLOCKS_PER_PROCESS)
+            for block in blocks:
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(block), block))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            logging.warning(f"Client {self.address_string()} disconnected before all {data_lines} records were sent")
+            self.close_connection = True
+
+    def read_generate_request(self) -> tuple[str, int]:
+        # rfile.read() with a negative size waits for the client to close, a bad length ends the connection instead.
+        content_length = self.headers.get('Content-Length') or '0'
+        if not content_length.strip().isdigit():
+            self.close_connection = True
+            raise ValueError(f"Content-Length must be a non-negative integer: {content_length!r}")
+        body_size = int(content_length)
+        if body_size > MAX_REQUEST_BODY_SIZE:
+            self.close_connection = True
+            raise ValueError(f"Request body is larger than {MAX_REQUEST_BODY_SIZE} bytes")
+
+        try:
+            request = json.loads(self.rfile.read(body_size) or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Request body is not valid JSON: {e}") from e
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+
+        data_schema = request.get('data_schema', self.server.args['data_schema'])
+        if data_schema is None:
+            raise ValueError("data_schema is required, in the request body or as the server's --data_schema")
+        if isinstance(data_schema, str):
+            try:
+                data_schema = json.loads(data_schema)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"data_schema is not valid JSON: {e}") from e
+        if 'data_schema' in request and get_value_file_paths(data_schema):
+            raise ValueError("@file: value lists are only allowed in the server's own --data_schema")
+
+        data_lines = request.get('data_lines', self.server.args['data_lines'])
+        if not isinstance(data_lines, int) or isinstance(data_lines, bool) or data_lines <= 0:
+            raise ValueError(f"data_lines must be a positive integer: {data_lines!r}")
+
+        return json.dumps(data_schema), data_lines
+
+    def send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logging.info(f"{self.address_string()} - {format % args}")
+
+
+class GeneratorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, args: dict, pool: Pool | None = None):
+        super().__init__((args['serve_host'], args['serve_port']), GenerateRequestHandler)
+        self.args = args
+        self.pool = pool
+
+
+def serve(args: dict) -> None:
+    pool = multiprocessing.Pool(processes=args['multiprocessing']) if args['multiprocessing'] > 1 else None
+
+    try:
+        with GeneratorServer(args, pool) as server:
+            host, port = server.server_address[:2]
+            logging.info(f"Serving generated NDJSON on http://{host}:{port}/generate "
+                         f"with {args['multiprocessing']} processes, press Ctrl+C to stop")
+            server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Server stopped")
+    except OSError as e:
+        logging.error(f"Failed to start server on {args['serve_host']}:{args['serve_port']}: {e}")
+        sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
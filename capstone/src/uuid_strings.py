@@ -0,0 +1,34 @@
+import os
+import random
+
+from capstone.src.constants import UUID_BLOCK_SIZE
+
+# Version 4 UUID strings formatted in bulk: random bytes are drawn for a whole block at once,
+# hex encoded in one call and sliced into the 8-4-4-4-12 layout, with the version nibble
+# replaced by 4 and the variant nibble mapped to 8-b. The result is the same string
+# str(uuid.UUID(bytes=..., version=4)) gives for the same bytes, without a UUID object per value.
+
+VARIANT_NIBBLES = {nibble: '89ab'[int(nibble, 16) & 3] for nibble in '0123456789abcdef'}
+
+def format_uuid_strings(random_bytes: bytes) -> list[str]:
+    h = random_bytes.hex()
+    variants = VARIANT_NIBBLES
+    return [f"{h[i:i + 8]}-{h[i + 8:i + 12]}-4{h[i + 13:i + 16]}-{variants[h[i + 16]]}{h[i + 17:i + 20]}-{h[i + 20:i + 32]}"
+            for i in range(0, len(h), 32)]
+
+def generate_uuid_strings(size: int, rng: random.Random | None = None) -> list[str]:
+    return format_uuid_strings(rng.randbytes(16 * size) if rng else os.urandom(16 * size))
+
+# Values generated one at a time are taken from a per-process block of preformatted strings.
+_uuid_block = []
+
+def next_uuid_string() -> str:
+    try:
+        return _uuid_block.pop()
+    except IndexError:
+        _uuid_block.extend(generate_uuid_strings(UUID_BLOCK_SIZE))
+        return _uuid_block.pop()
+
+# A forked worker must not hand out the UUIDs left in its parent's block.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_uuid_block.clear)
@@ -0,0 +1,92 @@
+import codecs
+import hashlib
+import mmap
+import os
+import random
+import re
+from array import array
+from functools import lru_cache
+from itertools import chain
+
+from capstone.src.constants import VALUE_FILE_CHECK_BLOCK_SIZE, VALUE_LIST_CACHE_SIZE
+
+# `str:@file:names.txt` picks values from a UTF-8 text file with one value per line, empty lines skipped.
+# The file is memory-mapped as a blob, and the start and end offset of every value is kept in an
+# anonymous shared mapping, so forked pool workers use both without a copy. A pick is one random
+# index, two offset lookups and one slice. Each version of a file (absolute path, modification time
+# and size) is loaded once per process, so a long running --serve process picks up edited files.
+
+# Bytes json.dumps would escape, a file without any of them is written into the output as is.
+# Line breaks only separate values, they are never part of one.
+_ESCAPED_BYTES = re.compile(rb'["\\\x00-\x09\x0b\x0c\x0e-\x1f\x80-\xff]')
+_VALUE_LINES = re.compile(rb'[^\r\n]+')
+
+
+class ValueList:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Value file is empty: {path}")
+            self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offsets = array('Q', chain.from_iterable(match.span() for match in _VALUE_LINES.finditer(self.blob)))
+        if not offsets:
+            raise ValueError(f"Value file has no values: {path}")
+        shared_offsets = mmap.mmap(-1, len(offsets) * offsets.itemsize)
+        shared_offsets[:] = offsets.tobytes()
+        self.offsets = memoryview(shared_offsets).cast('Q')
+        self.size = len(offsets) // 2
+
+        self.needs_escaping = _ESCAPED_BYTES.search(self.blob) is not None
+        if self.needs_escaping:
+            self._check_utf8()
+
+    def _check_utf8(self) -> None:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for start in range(0, len(self.blob), VALUE_FILE_CHECK_BLOCK_SIZE):
+                decoder.decode(self.blob[start:start + VALUE_FILE_CHECK_BLOCK_SIZE])
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Value file is not valid UTF-8: {self.path}: {e}") from e
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int) -> str:
+        return self.blob[self.offsets[2 * index]:self.offsets[2 * index + 1]].decode()
+
+    def choice(self, rng: random.Random | None = None) -> str:
+        return self[(rng or random).randrange(self.size)]
+
+    def sample(self, size: int, rng: random.Random | None = None) -> list[str]:
+        blob, offsets = self.blob, self.offsets
+        return [blob[offsets[2 * i]:offsets[2 * i + 1]].decode()
+                for i in (rng or random).choices(range(self.size), k=size)]
+
+    def digest(self) -> str:
+        return hashlib.sha256(self.blob).hexdigest()
+
+    def __reduce__(self):
+        # Pickled as its path, a spawned worker or another process maps the file itself.
+        return load_value_list, (self.path,)
+
+
+def value_file_version(path: str) -> tuple[str, int, int]:
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ValueError(f"Failed to load value file '{path}': {e}") from e
+    return path, stat.st_mtime_ns, stat.st_size
+
+def load_value_list(path: str) -> ValueList:
+    return _load_value_list(*value_file_version(path))
+
+@lru_cache(maxsize=VALUE_LIST_CACHE_SIZE)
+def _load_value_list(path: str, mtime_ns: int, size: int) -> ValueList:
+    try:
+        return ValueList(path)
+    except OSError as e:
+        raise ValueError(f"Failed to load value file '{path}': {e}") from e
@@ -3,8 +3,39 @@ import os
 import uuid
 import random
 import json
+import pickle
+import gzip
+import bz2
+import lzma
+import tarfile
+import zipfile
+import logging
+import tracemalloc
+import re
+import threading
+import http.client
+import multiprocessing
+import subprocess
+import sys
+
+from capstone.src import arguments_validators, data_schema, generators, file_utils, schema_plan, batch_generators, record_encoder
+from capstone.src import pipeline, archive_sink, metrics, profiling, exception_utils
+from capstone.src import records as records_api
+from capstone.src import server, manifest, config_loader, output_cache, uuid_strings, value_lists
+from capstone.src.parser import create_parser
+
+
+def build_args(tmp_path, **overrides) -> dict:
+    args = {'path_to_save_files': str(tmp_path), 'file_name': 'data', 'file_prefix': 'count',
+            'files_count': 1, 'data_lines': 3, 'data_schema': {"age": "int:7"}, 'clear_path': False,
+            'multiprocessing': 1, 'engine': 'record', 'output_format': 'json', 'files_per_task': 1,
+            'pipeline': False, 'clear_mode': 'sync', 'compression': 'none', 'archive': 'none',
+            'stats': False, 'metrics_file': '', 'profile': 'none', 'serve': False,
+            'serve_host': '127.0.0.1', 'serve_port': 0, 'manifest': None, 'seed': None,
+            'cache_dir': '', 'cache_size_mb': 1024}
+    args.update(overrides)
+    return args
 
-from capstone.src import arguments_validators, data_schema, generators, file_utils
 
 class TestValidatePathToSaveFilesArgument:
     @pytest.mark.parametrize("path_input", [".", ""])
@@ -71,6 +102,17 @@ class TestValidateMultiprocessingArgument:
         assert result == 4
 
 
+class TestValidateFilesPerTaskArgument:
+    @pytest.mark.parametrize("files_per_task", [-1, 0])
+    def test_invalid_files_per_task(self, files_per_task):
+        with pytest.raises(SystemExit) as system_info:
+            arguments_validators.validate_files_per_task(files_per_task)
+        assert system_info.value.code == 1
+
+    def test_valid_files_per_task(self):
+        assert arguments_validators.validate_files_per_task(4) == 4
+
+
 class TestValidateDataSchemaArgument:
     @pytest.mark.parametrize("schema,should_pass", [
         ({"name": "str:rand", "age": "int:rand(1, 100)"}, True),
@@ -184,6 +226,36 @@ class TestGenerateFileName:
         assert result == "test_1.json"
 
 
+class TestGenerateUniqueFileName:
+    def test_reserves_file(self, tmp_path):
+        file_path = generators.generate_unique_file_name(str(tmp_path), "test", "count", 1)
+
+        assert file_path == str(tmp_path.joinpath("test_1.json"))
+        assert tmp_path.joinpath("test_1.json").exists()
+        assert not os.access(file_path, os.X_OK)
+
+    def test_retries_random_prefix_on_collision(self, tmp_path, monkeypatch):
+        tmp_path.joinpath("test_1111.json").touch()
+        values = iter([1111, 1111, 2222])
+        monkeypatch.setattr(random, "randint", lambda x, y: next(values))
+
+        file_path = generators.generate_unique_file_name(str(tmp_path), "test", "random", 1)
+        assert file_path == str(tmp_path.joinpath("test_2222.json"))
+
+    def test_existing_count_file_exits(self, tmp_path):
+        tmp_path.joinpath("test_1.json").touch()
+        with pytest.raises(SystemExit) as system_info:
+            generators.generate_unique_file_name(str(tmp_path), "test", "count", 1)
+        assert system_info.value.code == 1
+
+    def test_gives_up_after_max_attempts(self, tmp_path, monkeypatch):
+        tmp_path.joinpath("test_1111.json").touch()
+        monkeypatch.setattr(random, "randint", lambda x, y: 1111)
+        with pytest.raises(SystemExit) as system_info:
+            generators.generate_unique_file_name(str(tmp_path), "test", "random", 1)
+        assert system_info.value.code == 1
+
+
 class TestGenerateValue:
     @pytest.mark.parametrize("data_type,instruction,expected_type", [
         ("str", "rand", str),
@@ -247,16 +319,421 @@ class TestGenerateValue:
         assert result == expected
 
 
-class TestGenerateDataRecord:
-    def test_single_field_string(self, monkeypatch):
-        monkeypatch.setattr("capstone.src.generators.generate_value",
-                            lambda t, i: "test_string")
+class TestSeededGeneration:
+    SCHEMA = {"id": "int:rand(1, 1000000)", "name": "str:rand", "type": "str:['client', 'partner']",
+              "score": "int:rand"}
+
+    @staticmethod
+    def read_outputs(directory) -> dict:
+        return {path.name: path.read_bytes() for path in directory.iterdir()}
+
+    def test_validate_seed(self):
+        assert arguments_validators.validate_seed(None) is None
+        assert arguments_validators.validate_seed(0) == 0
+        with pytest.raises(SystemExit):
+            arguments_validators.validate_seed(-1)
+
+    def test_generate_value_is_reproducible(self):
+        values = [[generators.generate_value(*instruction, random.Random(7))
+                   for instruction in [("str", "rand"), ("int", "rand"), ("int", "rand(1, 9)"), ("str", "['a', 'b']")]]
+                  for _ in range(2)]
+        assert values[0] == values[1]
+        assert uuid.UUID(values[0][0]).version == 4
+
+    @pytest.mark.parametrize("file_prefix", ["random", "uuid"])
+    def test_file_names_are_reproducible(self, file_prefix):
+        names = [generators.generate_file_name("data", file_prefix, 3, rng=generators.derive_rng(5, 3, "name"))
+                 for _ in range(2)]
+        assert names[0] == names[1]
+        assert generators.derive_rng(None, 3, "name") is None
+
+    def test_seeded_random_file_names_never_collide(self):
+        numbers = [generators.seeded_file_number(5, index) for index in range(100000)]
+
+        assert len(set(numbers)) == len(numbers)
+        assert all(100000 <= number <= 9999999 for number in numbers)
+        assert numbers[:10] == [generators.seeded_file_number(5, index) for index in range(10)]
+        assert numbers[:10] != [generators.seeded_file_number(6, index) for index in range(10)]
+
+    def test_seeded_random_name_retries_when_file_exists(self, tmp_path):
+        taken = tmp_path.joinpath(generators.generate_file_name("data", "random", 3, seed=5))
+        taken.write_text("old")
+
+        file_path = generators.generate_unique_file_name(str(tmp_path), "data", "random", 3, seed=5)
+
+        assert file_path != str(taken)
+        assert taken.read_text() == "old"
+
+    @pytest.mark.parametrize("engine", ["record", "batch"])
+    @pytest.mark.parametrize("file_prefix", ["count", "random", "uuid"])
+    def test_output_does_not_depend_on_process_count(self, tmp_path, engine, file_prefix):
+        outputs = []
+        for process_count in (1, 2):
+            directory = tmp_path.joinpath(str(process_count))
+            directory.mkdir()
+            generators.generate_and_save_data(build_args(directory, data_schema=self.SCHEMA, files_count=4,
+                                                         data_lines=30, multiprocessing=process_count,
+                                                         engine=engine, file_prefix=file_prefix, seed=42))
+            outputs.append(self.read_outputs(directory))
+
+        assert outputs[0] == outputs[1]
+        assert len(set(outputs[0].values())) == 4
+
+    def test_single_file_segments_match_sequential_file(self, tmp_path):
+        outputs = []
+        for process_count in (1, 2):
+            directory = tmp_path.joinpath(str(process_count))
+            directory.mkdir()
+            generators.generate_and_save_data(build_args(directory, data_schema=self.SCHEMA, data_lines=25500,
+                                                         multiprocessing=process_count, engine="batch",
+                                                         output_format="jsonl", seed=3))
+            outputs.append(self.read_outputs(directory))
+
+        assert outputs[0] == outputs[1]
+
+    def test_archive_does_not_depend_on_process_count(self, tmp_path):
+        outputs = []
+        for process_count in (1, 2):
+            directory = tmp_path.joinpath(str(process_count))
+            directory.mkdir()
+            generators.generate_and_save_data(build_args(directory, data_schema=self.SCHEMA, files_count=3,
+                                                         multiprocessing=process_count, archive="tar", seed=9))
+            with tarfile.open(directory.joinpath("data.tar")) as archive:
+                outputs.append({member.name: archive.extractfile(member).read() for member in archive})
+
+        assert outputs[0] == outputs[1]
+
+    def test_seeds_give_different_data(self, tmp_path):
+        outputs = []
+        for seed in (1, 2, None, None):
+            directory = tmp_path.joinpath(str(len(outputs)))
+            directory.mkdir()
+            generators.generate_and_save_data(build_args(directory, data_schema=self.SCHEMA, seed=seed))
+            outputs.append(directory.joinpath("data_1.json").read_bytes())
+
+        assert len(set(outputs)) == 4
+
+
+class TestOutputCache:
+    SCHEMA = {"id": "int:rand(1, 1000)", "name": "str:rand"}
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        cache_dir = tmp_path.joinpath("cache")
+        cache_dir.mkdir()
+        return str(cache_dir)
+
+    def run(self, tmp_path, name, **overrides):
+        directory = tmp_path.joinpath(name)
+        directory.mkdir()
+        generators.generate_and_save_data(build_args(directory, **dict({"data_schema": self.SCHEMA,
+                                                                         "files_count": 3, "seed": 1}, **overrides)))
+        return directory
+
+    def test_cache_key(self):
+        args = build_args("unused", data_schema=self.SCHEMA, seed=1)
+        key = output_cache.build_cache_key(args)
+
+        assert output_cache.build_cache_key(dict(args, data_schema={"id": "int: rand(1,1000)", "name": "str:rand"},
+                                                 multiprocessing=4, files_per_task=3)) == key
+        assert output_cache.build_cache_key(dict(args, seed=2)) != key
+        assert output_cache.build_cache_key(dict(args, data_lines=4)) != key
+        assert output_cache.build_cache_key(dict(args, data_schema={"name": "str:rand", "id": "int:rand(1, 1000)"})) != key
+
+    def test_repeat_run_links_cached_files(self, tmp_path, cache_dir, monkeypatch):
+        first = self.run(tmp_path, "first", cache_dir=cache_dir)
+        monkeypatch.setattr(generators, "generate_output", lambda args: pytest.fail("output was regenerated"))
+        second = self.run(tmp_path, "second", cache_dir=cache_dir)
+
+        names = sorted(path.name for path in first.iterdir())
+        assert names == ["data_1.json", "data_2.json", "data_3.json"]
+        assert sorted(path.name for path in second.iterdir()) == names
+        for name in names:
+            assert first.joinpath(name).read_bytes() == second.joinpath(name).read_bytes()
+            assert os.path.samefile(first.joinpath(name), second.joinpath(name))
+        assert [name for name in os.listdir(cache_dir)] == [output_cache.build_cache_key(
+            build_args(first, data_schema=self.SCHEMA, files_count=3, seed=1))]
+
+    def test_copies_when_hardlinks_fail(self, tmp_path, cache_dir, monkeypatch):
+        self.run(tmp_path, "first", cache_dir=cache_dir)
+        monkeypatch.setattr(os, "link", lambda source, target: (_ for _ in ()).throw(OSError("cross-device link")))
+        second = self.run(tmp_path, "second", cache_dir=cache_dir)
+
+        assert second.joinpath("data_1.json").stat().st_nlink == 1
+        assert json.loads(second.joinpath("data_1.json").read_text())
+
+    def test_existing_output_is_not_overwritten(self, tmp_path, cache_dir):
+        first = self.run(tmp_path, "first", cache_dir=cache_dir)
+        with pytest.raises(SystemExit):
+            generators.generate_and_save_data(build_args(first, data_schema=self.SCHEMA, files_count=3, seed=1,
+                                                         cache_dir=cache_dir))
+
+    def test_unseeded_output_is_not_cached(self, tmp_path, cache_dir, caplog):
+        with caplog.at_level(logging.WARNING):
+            self.run(tmp_path, "first", cache_dir=cache_dir, seed=None)
+
+        assert os.listdir(cache_dir) == []
+        assert "needs a --seed" in caplog.text
+
+    def test_timestamp_output_is_not_cached(self, tmp_path, cache_dir, caplog):
+        with caplog.at_level(logging.WARNING):
+            self.run(tmp_path, "first", cache_dir=cache_dir, data_schema=dict(self.SCHEMA, created_at="timestamp:"))
+
+        assert os.listdir(cache_dir) == []
+        assert "created_at" in caplog.text
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path, cache_dir):
+        for seed in (1, 2, 3):
+            self.run(tmp_path, f"seed_{seed}", cache_dir=cache_dir, seed=seed)
+        entries = {seed: output_cache.get_entry_path(cache_dir, output_cache.build_cache_key(
+            build_args(tmp_path, data_schema=self.SCHEMA, files_count=3, seed=seed))) for seed in (1, 2, 3)}
+        for age, seed in enumerate((3, 1, 2)):
+            os.utime(entries[seed], (1000 + age, 1000 + age))
+
+        output_cache.evict_cache_entries(cache_dir, output_cache.get_entry_size(entries[1]) * 2)
+
+        assert [os.path.isdir(entries[seed]) for seed in (1, 2, 3)] == [True, True, False]
+
+    def test_validate_cache_arguments(self, tmp_path):
+        assert arguments_validators.validate_cache_dir("") == ""
+        assert arguments_validators.validate_cache_dir(str(tmp_path.joinpath("new"))) == str(tmp_path.joinpath("new"))
+        assert tmp_path.joinpath("new").is_dir()
+        with pytest.raises(SystemExit):
+            arguments_validators.validate_cache_size_mb(0)
+
+
+class TestUuidStrings:
+    def test_matches_uuid_formatting(self):
+        random_bytes = os.urandom(16 * 500)
+        expected = [str(uuid.UUID(bytes=random_bytes[offset:offset + 16], version=4))
+                    for offset in range(0, len(random_bytes), 16)]
+        assert uuid_strings.format_uuid_strings(random_bytes) == expected
+
+    def test_generated_strings_are_version_4(self):
+        values = uuid_strings.generate_uuid_strings(1000)
+        assert len(set(values)) == 1000
+        assert all(uuid.UUID(value).version == 4 and uuid.UUID(value).variant == uuid.RFC_4122 for value in values)
+
+    def test_seeded_strings_are_reproducible(self):
+        assert uuid_strings.generate_uuid_strings(10, random.Random(3)) == \
+            uuid_strings.generate_uuid_strings(10, random.Random(3))
+
+    def test_next_uuid_string_refills_block(self, monkeypatch):
+        monkeypatch.setattr("capstone.src.uuid_strings.UUID_BLOCK_SIZE", 4)
+        uuid_strings._uuid_block.clear()
+        values = [uuid_strings.next_uuid_string() for _ in range(10)]
+        assert len(set(values)) == 10
+        assert len(uuid_strings._uuid_block) == 2
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+    def test_forked_process_does_not_reuse_parent_block(self):
+        uuid_strings.next_uuid_string()
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            child_value = pool.apply(uuid_strings.next_uuid_string)
+        assert child_value != uuid_strings.next_uuid_string()
+
+
+class TestValueLists:
+    @pytest.fixture
+    def names_file(self, tmp_path):
+        file_path = tmp_path.joinpath("names.txt")
+        file_path.write_bytes(b"Anna\r\nBob\n\nCarl\nDora")
+        return str(file_path)
+
+    @pytest.fixture
+    def escaped_file(self, tmp_path):
+        file_path = tmp_path.joinpath("escaped.txt")
+        file_path.write_text('Kraków\nsay "hi"\nback\\slash\n100%\n', encoding="utf-8")
+        return str(file_path)
+
+    def test_values_are_lines(self, names_file):
+        value_list = value_lists.load_value_list(names_file)
+        assert [value_list[i] for i in range(len(value_list))] == ["Anna", "Bob", "Carl", "Dora"]
+        assert not value_list.needs_escaping
+        assert value_lists.load_value_list(names_file) is value_list
+
+    def test_picks(self, names_file):
+        value_list = value_lists.load_value_list(names_file)
+        assert set(value_list.sample(200)) == {"Anna", "Bob", "Carl", "Dora"}
+        assert value_list.choice() in {"Anna", "Bob", "Carl", "Dora"}
+        assert value_list.sample(20, random.Random(1)) == value_list.sample(20, random.Random(1))
+        assert generators.generate_value("str", f"@file:{names_file}") in {"Anna", "Bob", "Carl", "Dora"}
+
+    def test_plan_pickles_as_path(self, names_file):
+        plan = schema_plan.compile_data_schema({"name": f"str:@file:{names_file}"})
+        assert plan[0].kind == "file_choice"
+        restored = pickle.loads(pickle.dumps(plan))
+        assert restored[0].argument is plan[0].argument
+        assert restored[0].generate() in {"Anna", "Bob", "Carl", "Dora"}
+
+    @pytest.mark.parametrize("engine", ["record", "batch"])
+    @pytest.mark.parametrize("output_format", ["json", "json-compact", "jsonl"])
+    def test_encoder_matches_json_dumps(self, names_file, escaped_file, engine, output_format):
+        plan = schema_plan.compile_data_schema({"name": f"str:@file:{names_file}", "id": "int:rand",
+                                                "text": f"str:@file: {escaped_file}"})
+        rows = generators.generate_data_rows(plan, 50, engine)
+        encode_chunk = record_encoder.compile_chunk_encoder(plan, output_format)
+        records = schema_plan.records_from_rows(plan, rows)
+
+        assert encode_chunk(rows) == TestRecordEncoder.REFERENCE_ENCODERS[output_format](records)
+        assert {record["text"] for record in records} <= {"Kraków", 'say "hi"', "back\\slash", "100%"}
+
+    @pytest.mark.parametrize("type_part,content", [
+        ("int", b"1\n2\n"),
+        ("str", b""),
+        ("str", b"\n\r\n"),
+        ("str", b"caf\xe9\n"),
+    ])
+    def test_invalid_value_files(self, tmp_path, type_part, content):
+        file_path = tmp_path.joinpath("values.txt")
+        file_path.write_bytes(content)
+        with pytest.raises(SystemExit):
+            data_schema.validate_data_schema({"value": f"{type_part}:@file:{file_path}"})
+
+    def test_edited_file_is_reloaded(self, tmp_path):
+        file_path = tmp_path.joinpath("values.txt")
+        file_path.write_text("Anna\n")
+        value_list = value_lists.load_value_list(str(file_path))
+        assert value_lists.load_value_list(str(file_path)) is value_list
+
+        file_path.write_text("Bob\nCarl\n")
+        reloaded = value_lists.load_value_list(str(file_path))
+        assert reloaded is not value_list
+        assert [reloaded[i] for i in range(len(reloaded))] == ["Bob", "Carl"]
+
+    def test_inline_schema_with_path_is_parsed(self):
+        schema = '{"name": "str:@file:/data/names.txt"}'
+        assert data_schema.load_json_data_schema(schema) == {"name": "str:@file:/data/names.txt"}
+
+    def test_missing_value_file(self, tmp_path):
+        with pytest.raises(SystemExit):
+            data_schema.validate_data_schema({"value": f"str:@file:{tmp_path.joinpath('missing.txt')}"})
+
+    def test_pool_workers_pick_from_file(self, tmp_path, names_file):
+        generators.generate_and_save_data(build_args(tmp_path, data_schema={"name": f"str:@file:{names_file}"},
+                                                     files_count=4, data_lines=50, multiprocessing=2))
+        values = {record["name"] for path in tmp_path.glob("data_*.json") for record in json.loads(path.read_text())}
+        assert values <= {"Anna", "Bob", "Carl", "Dora"}
+        assert len(list(tmp_path.glob("data_*.json"))) == 4
+
+    def test_cache_key_follows_file_content(self, tmp_path, names_file):
+        copy_path = tmp_path.joinpath("copy.txt")
+        copy_path.write_bytes(open(names_file, "rb").read())
+        other_path = tmp_path.joinpath("other.txt")
+        other_path.write_text("Eve\n")
 
-        schema = {"name": "string:random"}
-        record = generators.generate_data_record(schema)
+        keys = [output_cache.build_cache_key(build_args(tmp_path, data_schema={"name": f"str:@file:{path}"}, seed=1))
+                for path in (names_file, copy_path, other_path)]
+        assert keys[0] == keys[1] != keys[2]
+
+
+class TestGenerateDataRecord:
+    def test_single_field_string(self):
+        record = generators.generate_data_record({"name": "str:test_string"})
 
         assert record == {"name": "test_string"}
 
+    def test_record_matches_compiled_plan(self):
+        schema = {"id": "int:rand(1, 1000)", "name": "str:rand", "type": "str:['client', 'partner']"}
+
+        record = generators.generate_data_record(schema, random.Random(3))
+
+        assert record == schema_plan.generate_record_from_plan(schema_plan.compile_data_schema(schema),
+                                                               random.Random(3))
+
+
+class TestCompileDataSchema:
+    @pytest.mark.parametrize("raw_value,expected_kind,expected_argument", [
+        ("timestamp:", "timestamp", None),
+        ("str:rand", "uuid", None),
+        ("int:rand", "rand_int", (0, 10000)),
+        ("int:rand( 5 , 15 )", "rand_int", (5, 15)),
+        ("str:['client', 'partner']", "choice", ["client", "partner"]),
+        ("int:42", "constant", 42),
+        ("str:hello world", "constant", "hello world"),
+        ("str:", "constant", ""),
+        ("int:", "constant", None),
+    ])
+    def test_field_kinds(self, raw_value, expected_kind, expected_argument):
+        field = schema_plan.compile_schema_field("key", raw_value)
+        assert field.kind == expected_kind
+        assert field.argument == expected_argument
+
+    def test_generated_record_matches_schema(self):
+        plan = schema_plan.compile_data_schema({
+            "id": "int:rand(1, 3)",
+            "name": "str:rand",
+            "type": "str:['client', 'partner']",
+            "age": "int:30",
+            "created_at": "timestamp:"
+        })
+        record = schema_plan.generate_record_from_plan(plan)
+
+        assert list(record) == ["id", "name", "type", "age", "created_at"]
+        assert 1 <= record["id"] <= 3
+        uuid.UUID(record["name"])
+        assert record["type"] in ["client", "partner"]
+        assert record["age"] == 30
+        assert isinstance(record["created_at"], float)
+
+    def test_plan_is_picklable(self):
+        plan = schema_plan.compile_data_schema({"id": "int:rand(1, 3)", "type": "str:['a', 'b']"})
+        restored = pickle.loads(pickle.dumps(plan))
+        assert [field.key for field in restored] == ["id", "type"]
+        assert restored[1].generate() in ["a", "b"]
+
+    def test_generate_data_lines_uses_plan(self):
+        plan = schema_plan.compile_data_schema({"age": "int:7", "name": "str:bob"})
+        assert generators.generate_data_lines(plan, 3) == [{"age": 7, "name": "bob"}] * 3
+
+    @pytest.mark.parametrize("engine", ["record", "batch"])
+    def test_rows_are_tuples_in_plan_order(self, engine):
+        plan = schema_plan.compile_data_schema({"age": "int:7", "name": "str:bob", "type": "str:['a']"})
+        assert generators.generate_data_rows(plan, 2, engine) == [(7, "bob", "a")] * 2
+        assert all(type(chunk[0]) is tuple for chunk in generators.iter_data_chunks(plan, 5, engine, chunk_size=2))
+
+
+class TestBatchEngine:
+    @pytest.fixture
+    def plan(self):
+        return schema_plan.compile_data_schema({
+            "id": "int:rand(1, 3)",
+            "score": "int:rand",
+            "name": "str:rand",
+            "type": "str:['client', 'partner']",
+            "age": "int:30",
+            "created_at": "timestamp:"
+        })
+
+    def test_columns_have_requested_size(self, plan):
+        columns = batch_generators.generate_columns(plan, 50)
+        assert len(columns) == len(plan)
+        assert all(len(column) == 50 for column in columns)
+
+    def test_column_values_follow_schema(self, plan):
+        ids, scores, names, types, ages, created_at = batch_generators.generate_columns(plan, 200)
+
+        assert set(ids) <= {1, 2, 3}
+        assert all(0 <= score <= 10000 for score in scores)
+        assert all(uuid.UUID(name).version == 4 for name in names)
+        assert len(set(names)) == 200
+        assert set(types) <= {"client", "partner"}
+        assert ages == [30] * 200
+        assert all(isinstance(value, float) for value in created_at)
+
+    def test_wide_range_falls_back_to_randint(self):
+        column = batch_generators.generate_random_int_column(0, 2 ** 64, 10)
+        assert all(0 <= value <= 2 ** 64 for value in column)
+
+    def test_batch_records_match_record_engine_shape(self, plan, monkeypatch):
+        monkeypatch.setattr("capstone.src.batch_generators.BATCH_SIZE", 7)
+        batch = generators.generate_data_lines(plan, 20, "batch")
+        single = generators.generate_data_lines(plan, 20, "record")
+
+        assert len(batch) == 20
+        assert all(list(record) == list(single[0]) for record in batch)
+        assert [type(value) for value in batch[0].values()] == [type(value) for value in single[0].values()]
+
 
 class TestOutputOperations:
     def test_print_data_to_console(self, capfd):
@@ -279,6 +756,113 @@ class TestOutputOperations:
         assert saved == data
 
 
+class TestStreamingWriter:
+    @pytest.mark.parametrize("chunks", [
+        [[{"city": "Cracow"}, {"city": "London"}], [{"city": "Paris"}]],
+        [[{"city": "Cracow", "size": 2}], [], [{"city": "Oslo", "size": None}]],
+        [[{"city": "Cracow"}]],
+        [[]],
+        [],
+    ])
+    def test_matches_json_dump_output(self, tmp_path, chunks):
+        file_path = tmp_path.joinpath("output.json")
+        file_utils.stream_data_to_file(iter(chunks), str(file_path))
+
+        expected = json.dumps([record for chunk in chunks for record in chunk], indent=2)
+        assert file_path.read_text() == expected
+
+    def test_iter_data_chunks_respects_chunk_size(self):
+        plan = schema_plan.compile_data_schema({"age": "int:7"})
+        chunks = list(generators.iter_data_chunks(plan, 25, chunk_size=10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+
+    def test_generate_and_save_file(self, tmp_path):
+        plan = schema_plan.compile_data_schema({"age": "int:7", "name": "str:bob"})
+        file_path = tmp_path.joinpath("output.json")
+        generators.generate_and_save_file(plan, 3, "batch", str(file_path))
+
+        assert json.loads(file_path.read_text()) == [{"age": 7, "name": "bob"}] * 3
+
+
+class TestOutputFormats:
+    CHUNKS = [[{"id": 1, "name": "Jacob"}, {"id": 2, "name": "Bob"}], [], [{"id": 3, "name": "Zoë"}]]
+    RECORDS = [record for chunk in CHUNKS for record in chunk]
+
+    def test_json_compact(self, tmp_path):
+        file_path = tmp_path.joinpath("output.json")
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(file_path), "json-compact")
+
+        assert file_path.read_text() == json.dumps(self.RECORDS, separators=(',', ':'))
+
+    def test_json_compact_empty(self, tmp_path):
+        file_path = tmp_path.joinpath("output.json")
+        file_utils.stream_data_to_file(iter([]), str(file_path), "json-compact")
+
+        assert json.loads(file_path.read_text()) == []
+
+    def test_jsonl(self, tmp_path):
+        file_path = tmp_path.joinpath("output.jsonl")
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(file_path), "jsonl")
+
+        lines = file_path.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == self.RECORDS
+
+    def test_jsonl_append(self, tmp_path):
+        file_path = tmp_path.joinpath("output.jsonl")
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(file_path), "jsonl")
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(file_path), "jsonl", append=True)
+
+        lines = file_path.read_text().splitlines()
+        assert [json.loads(line) for line in lines] == self.RECORDS * 2
+
+    def test_append_rejected_for_json_array(self, tmp_path):
+        with pytest.raises(SystemExit) as system_info:
+            file_utils.stream_data_to_file(iter(self.CHUNKS), str(tmp_path.joinpath("output.json")), "json", append=True)
+        assert system_info.value.code == 1
+
+    def test_file_name_extension(self):
+        assert generators.generate_file_name("test", "count", 2, "jsonl") == "test_2.jsonl"
+
+    def test_clear_existing_files_uses_extension(self, tmp_path):
+        tmp_path.joinpath("data_1.jsonl").touch()
+        tmp_path.joinpath("data_1.json").touch()
+        file_utils.clear_existing_files(str(tmp_path), "data", "jsonl")
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["data_1.json"]
+
+
+class TestRecordEncoder:
+    REFERENCE_ENCODERS = {
+        "json": file_utils.encode_json_chunk,
+        "json-compact": file_utils.encode_compact_json_chunk,
+        "jsonl": file_utils.encode_jsonl_chunk
+    }
+
+    @pytest.mark.parametrize("output_format", ["json", "json-compact", "jsonl"])
+    @pytest.mark.parametrize("schema", [
+        {"id": "int:rand(1, 1000)", "name": "str:rand", "type": "str:['client', 'partner']",
+         "level": "int:[1, 2, 3]", "created_at": "timestamp:"},
+        {"age": "int:30", "percent": "str:100%", "empty": "int:", "blank": "str:"},
+        {"city": "str:['Kraków', 'back\\\\slash', 'a%sb']"},
+        {"100% key": "int:rand", "ключ": "str:rand"},
+        {"flag": "int:[true, false]", "level": "int:[1, true]"},
+    ])
+    def test_matches_json_dumps(self, schema, output_format):
+        plan = schema_plan.compile_data_schema(schema)
+        rows = generators.generate_data_rows(plan, 50)
+        encode_chunk = record_encoder.compile_chunk_encoder(plan, output_format)
+
+        assert encode_chunk(rows) == self.REFERENCE_ENCODERS[output_format](schema_plan.records_from_rows(plan, rows))
+
+    def test_generated_file_is_unchanged(self, tmp_path):
+        plan = schema_plan.compile_data_schema({"id": "int:rand(1, 5)", "name": "str:rand"})
+        file_path = tmp_path.joinpath("output.json")
+        generators.generate_and_save_file(plan, 30, "record", str(file_path))
+
+        content = file_path.read_text()
+        assert content == json.dumps(json.loads(content), indent=2)
+
+
 class TestMultiprocessingLogic:
     def test_single_file_and_process(self):
         result = generators.distribute_files_across_processes(1, 1)
@@ -303,4 +887,703 @@ class TestMultiprocessingLogic:
             [5, 6, 7],
             [8, 9, 10]
         ]
-        assert result == expected
\ No newline at end of file
+        assert result == expected
+
+
+class TestDynamicScheduling:
+    @pytest.mark.parametrize("files_count,files_per_task,expected", [
+        (5, 2, [[1, 2], [3, 4], [5]]),
+        (3, 1, [[1], [2], [3]]),
+        (2, 10, [[1, 2]]),
+    ])
+    def test_split_file_indices(self, files_count, files_per_task, expected):
+        assert generators.split_file_indices(files_count, files_per_task) == expected
+
+    def test_worker_reports_its_work(self, tmp_path):
+        args = build_args(tmp_path, data_lines=2)
+        generators.init_worker(generators.build_generation_context(args, schema_plan.compile_data_schema(args['data_schema'])))
+
+        pid, files_written, busy_time, worker_metrics, worker_profile = generators.worker_generate_files([1, 2])
+
+        assert pid == os.getpid()
+        assert files_written == 2
+        assert busy_time >= 0
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["data_1.json", "data_2.json"]
+
+    def test_pool_generates_every_file(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=5, multiprocessing=2, files_per_task=2))
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [f"data_{i}.json" for i in range(1, 6)]
+        assert json.loads(tmp_path.joinpath("data_5.json").read_text()) == [{"age": 7}] * 3
+
+
+    def test_worker_exit_becomes_worker_error(self, tmp_path):
+        tmp_path.joinpath("data_1.json").touch()
+        args = build_args(tmp_path)
+        generators.init_worker(generators.build_generation_context(args, schema_plan.compile_data_schema(args['data_schema'])))
+
+        with pytest.raises(exception_utils.WorkerError):
+            generators.worker_generate_files([1])
+
+    def test_pool_error_exits_instead_of_hanging(self, tmp_path):
+        # A worker that hit error_and_exit used to leave the parent waiting for its result forever.
+        tmp_path.joinpath("data_2.json").touch()
+        args = build_args(tmp_path, files_count=4, multiprocessing=2)
+        command = ("import logging; from capstone.src import generators; logging.basicConfig(level=logging.INFO); "
+                   f"generators.generate_and_save_data({args!r})")
+        result = subprocess.run([sys.executable, "-c", command], capture_output=True, text=True, timeout=60,
+                                cwd=os.getcwd())
+
+        assert result.returncode == 1
+        assert "File already exists" in result.stderr
+        assert "Generation stopped" in result.stderr
+        assert "Traceback" not in result.stderr
+
+class TestParallelSingleFile:
+    @pytest.mark.parametrize("data_lines,process_count,expected", [
+        (100, 4, [100]),
+        (25000, 2, [10000, 10000, 5000]),
+        (160000, 2, [20000] * 8),
+    ])
+    def test_split_data_lines(self, data_lines, process_count, expected):
+        assert generators.split_data_lines(data_lines, process_count) == expected
+
+    @pytest.mark.parametrize("output_format", ["json", "json-compact", "jsonl"])
+    def test_segments_stitch_into_one_valid_file(self, tmp_path, output_format):
+        chunks = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        segments = []
+        for i, segment_chunks in enumerate([chunks, [], chunks]):
+            segment_path = str(tmp_path.joinpath(f"segment_{i}"))
+            segments.append((segment_path, file_utils.write_segment(iter(segment_chunks), segment_path, output_format)))
+
+        stitched = tmp_path.joinpath("stitched")
+        file_utils.stitch_segments(segments, str(stitched), output_format)
+        expected = tmp_path.joinpath("expected")
+        file_utils.stream_data_to_file(iter(chunks + chunks), str(expected), output_format)
+
+        assert stitched.read_text() == expected.read_text()
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["expected", "stitched"]
+
+    def test_generates_single_file_with_pool(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("capstone.src.generators.MIN_SEGMENT_LINES", 10)
+        generators.generate_and_save_data(build_args(tmp_path, data_lines=95, multiprocessing=2,
+                                                     data_schema={"id": "int:rand(1, 9)", "age": "int:7"}))
+
+        assert [path.name for path in tmp_path.iterdir()] == ["data_1.json"]
+        records = json.loads(tmp_path.joinpath("data_1.json").read_text())
+        assert len(records) == 95
+        assert all(record["age"] == 7 for record in records)
+
+
+class TestWritePipeline:
+    @pytest.mark.parametrize("output_format", ["json", "json-compact", "jsonl"])
+    def test_matches_direct_writer(self, tmp_path, output_format):
+        chunks = [[{"id": 1}, {"id": 2}], [], [{"id": 3}]]
+        file_jobs = [(str(tmp_path.joinpath(f"piped_{i}")), iter(chunks)) for i in range(3)]
+        timings = pipeline.run_write_pipeline(iter(file_jobs), output_format,
+                                              file_utils.CHUNK_ENCODERS[output_format], queue_size=1)
+
+        expected = tmp_path.joinpath("expected")
+        file_utils.stream_data_to_file(iter(chunks), str(expected), output_format)
+        for file_path, _ in file_jobs:
+            assert open(file_path).read() == expected.read_text()
+        assert set(timings) == {'generation', 'serialization', 'producer_blocked', 'write', 'writer_idle'}
+
+    def test_write_error_exits(self, tmp_path):
+        file_jobs = [(str(tmp_path.joinpath("missing", "data.json")), iter([[{"id": 1}]]))]
+        with pytest.raises(SystemExit) as system_info:
+            pipeline.run_write_pipeline(iter(file_jobs), "json", file_utils.encode_json_chunk)
+        assert system_info.value.code == 1
+
+    def test_generate_and_save_data_with_pipeline(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=3, data_lines=2500, pipeline=True))
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["data_1.json", "data_2.json", "data_3.json"]
+        assert json.loads(tmp_path.joinpath("data_3.json").read_text()) == [{"age": 7}] * 2500
+
+
+class TestClearExistingFiles:
+    @pytest.fixture
+    def populated_dir(self, tmp_path):
+        for i in range(25):
+            tmp_path.joinpath(f"data_{i}.json").touch()
+        tmp_path.joinpath("other_1.json").touch()
+        tmp_path.joinpath("data_1.jsonl").touch()
+        tmp_path.joinpath("data_dir.json").mkdir()
+        return tmp_path
+
+    def test_iter_matching_files(self, populated_dir):
+        matching = file_utils.iter_matching_files(str(populated_dir), "data", "json")
+        assert sorted(os.path.basename(path) for path in matching) == sorted(f"data_{i}.json" for i in range(25))
+
+    def test_sync_deletes_in_batches(self, populated_dir, monkeypatch):
+        monkeypatch.setattr("capstone.src.file_utils.CLEANUP_BATCH_SIZE", 4)
+        assert file_utils.clear_existing_files(str(populated_dir), "data") is None
+
+        assert sorted(path.name for path in populated_dir.iterdir()) == ["data_1.jsonl", "data_dir.json", "other_1.json"]
+
+    def test_background_mode(self, populated_dir):
+        cleanup_thread = file_utils.clear_existing_files(str(populated_dir), "data", background=True)
+        assert not populated_dir.joinpath("data_0.json").exists()
+
+        cleanup_thread.join()
+        assert sorted(path.name for path in populated_dir.iterdir()) == ["data_1.jsonl", "data_dir.json", "other_1.json"]
+
+    def test_failed_delete_exits(self, tmp_path, monkeypatch):
+        tmp_path.joinpath("data_1.json").touch()
+
+        def fail(path):
+            raise PermissionError("denied")
+        monkeypatch.setattr(os, "remove", fail)
+
+        with pytest.raises(SystemExit) as system_info:
+            file_utils.clear_existing_files(str(tmp_path), "data")
+        assert system_info.value.code == 1
+
+    def test_regenerate_with_background_clear(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=2))
+        generators.generate_and_save_data(build_args(tmp_path, files_count=2, clear_path=True, clear_mode='background'))
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["data_1.json", "data_2.json"]
+
+
+class TestCompressedOutput:
+    DECOMPRESSORS = {"gzip": gzip.decompress, "bz2": bz2.decompress, "lzma": lzma.decompress}
+    CHUNKS = [[{"id": 1, "name": "Jacob"}, {"id": 2, "name": "Bob"}], [{"id": 3, "name": "Alice"}]]
+
+    @pytest.mark.parametrize("output_format,compression,expected", [
+        ("json", "none", "json"),
+        ("json", "gzip", "json.gz"),
+        ("jsonl", "bz2", "jsonl.bz2"),
+        ("json-compact", "lzma", "json.xz"),
+    ])
+    def test_output_extension(self, output_format, compression, expected):
+        assert file_utils.get_output_extension(output_format, compression) == expected
+
+    @pytest.mark.parametrize("compression", ["gzip", "bz2", "lzma"])
+    @pytest.mark.parametrize("output_format", ["json", "jsonl"])
+    def test_stream_compressed(self, tmp_path, compression, output_format):
+        compressed = tmp_path.joinpath("compressed")
+        plain = tmp_path.joinpath("plain")
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(compressed), output_format, compression=compression)
+        file_utils.stream_data_to_file(iter(self.CHUNKS), str(plain), output_format)
+
+        assert self.DECOMPRESSORS[compression](compressed.read_bytes()) == plain.read_bytes()
+
+    @pytest.mark.parametrize("compression", ["gzip", "bz2", "lzma"])
+    def test_stitched_members_decompress_to_one_file(self, tmp_path, compression):
+        segments = []
+        for i in range(3):
+            segment_path = str(tmp_path.joinpath(f"segment_{i}"))
+            segments.append((segment_path, file_utils.write_segment(iter(self.CHUNKS), segment_path, "json",
+                                                                    compression=compression)))
+        stitched = tmp_path.joinpath("stitched")
+        file_utils.stitch_segments(segments, str(stitched), "json", compression)
+
+        expected = [record for _ in range(3) for chunk in self.CHUNKS for record in chunk]
+        assert json.loads(self.DECOMPRESSORS[compression](stitched.read_bytes())) == expected
+
+    def test_parallel_single_compressed_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("capstone.src.generators.MIN_SEGMENT_LINES", 10)
+        generators.generate_and_save_data(build_args(tmp_path, data_lines=95, multiprocessing=2, compression='gzip'))
+
+        assert [path.name for path in tmp_path.iterdir()] == ["data_1.json.gz"]
+        with gzip.open(tmp_path.joinpath("data_1.json.gz"), 'rt') as f:
+            assert json.load(f) == [{"age": 7}] * 95
+
+    def test_pipeline_compressed_files(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=2, pipeline=True, compression='bz2',
+                                                     output_format='jsonl'))
+
+        with bz2.open(tmp_path.joinpath("data_2.jsonl.bz2"), 'rt') as f:
+            assert [json.loads(line) for line in f] == [{"age": 7}] * 3
+
+
+class TestArchiveSink:
+    @pytest.mark.parametrize("archive,compression,expected", [
+        ("tar", "none", "tar"),
+        ("tar", "gzip", "tar.gz"),
+        ("tar", "lzma", "tar.xz"),
+        ("zip", "bz2", "zip"),
+    ])
+    def test_archive_extension(self, archive, compression, expected):
+        assert archive_sink.get_archive_extension(archive, compression) == expected
+
+    @pytest.mark.parametrize("multiprocessing_count", [1, 2])
+    @pytest.mark.parametrize("compression", ["none", "gzip"])
+    def test_tar_archive(self, tmp_path, multiprocessing_count, compression):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=5, archive='tar', compression=compression,
+                                                     multiprocessing=multiprocessing_count, files_per_task=2))
+
+        archive_name = "data.tar.gz" if compression == "gzip" else "data.tar"
+        assert [path.name for path in tmp_path.iterdir()] == [archive_name]
+        with tarfile.open(tmp_path.joinpath(archive_name)) as archive:
+            assert sorted(archive.getnames()) == [f"data_{i}.json" for i in range(1, 6)]
+            assert json.load(archive.extractfile("data_3.json")) == [{"age": 7}] * 3
+
+    def test_zip_archive(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=3, archive='zip', compression='gzip',
+                                                     output_format='jsonl', file_prefix='uuid'))
+
+        with zipfile.ZipFile(tmp_path.joinpath("data.zip")) as archive:
+            names = archive.namelist()
+            assert len(set(names)) == 3
+            assert all(name.startswith("data_") and name.endswith(".jsonl") for name in names)
+            assert archive.read(names[0]).decode().splitlines() == ['{"age":7}'] * 3
+
+    def test_pool_results_are_bounded(self):
+        submitted = []
+        consumed = []
+
+        class FakeResult:
+            def __init__(self, value):
+                self.value = value
+
+            def get(self):
+                consumed.append(self.value)
+                return self.value
+
+        class FakePool:
+            def apply_async(self, func, args):
+                submitted.append(args[0])
+                assert len(submitted) - len(consumed) <= 3
+                return FakeResult(func(*args))
+
+        results = list(generators.imap_bounded(FakePool(), lambda x: x * 2, range(10), 3))
+        assert results == [x * 2 for x in range(10)]
+
+    def test_member_names_stay_unique(self, tmp_path, monkeypatch):
+        values = iter([1111, 1111, 2222])
+        monkeypatch.setattr(random, "randint", lambda x, y: next(values))
+        name_member = generators.build_member_namer({'file_name': 'data', 'file_prefix': 'random',
+                                                      'output_format': 'json', 'seed': None})
+
+        assert [name_member(1), name_member(2)] == ["data_1111.json", "data_2222.json"]
+
+    def test_existing_archive_exits(self, tmp_path):
+        tmp_path.joinpath("data.tar").touch()
+        with pytest.raises(SystemExit) as system_info:
+            generators.generate_and_save_data(build_args(tmp_path, files_count=2, archive='tar'))
+        assert system_info.value.code == 1
+
+    def test_clear_path_replaces_archive(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=2, archive='tar'))
+        generators.generate_and_save_data(build_args(tmp_path, files_count=4, archive='tar', clear_path=True))
+
+        with tarfile.open(tmp_path.joinpath("data.tar")) as archive:
+            assert len(archive.getnames()) == 4
+
+
+class TestRunMetrics:
+    def test_metrics_file_reports_the_run(self, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        metrics_file = tmp_path / "metrics.json"
+
+        generators.generate_and_save_data(build_args(output_dir, files_count=2, data_lines=5,
+                                                     metrics_file=str(metrics_file)))
+
+        report = json.loads(metrics_file.read_text())
+        assert report['records'] == 10
+        assert report['files'] == 2
+        assert report['bytes_written'] == sum(path.stat().st_size for path in output_dir.iterdir())
+        assert set(report['stages']) == {'generation', 'serialization', 'io', 'cleanup'}
+        assert report['wall_time'] > 0
+        assert report['workers'] == []
+        if metrics.resource is not None:
+            assert report['peak_rss_bytes'] > 0
+
+    def test_pool_reports_every_worker(self, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        metrics_file = tmp_path / "metrics.json"
+
+        generators.generate_and_save_data(build_args(output_dir, files_count=4, data_lines=5, multiprocessing=2,
+                                                     metrics_file=str(metrics_file)))
+
+        report = json.loads(metrics_file.read_text())
+        assert report['records'] == 20
+        assert sum(worker['records'] for worker in report['workers']) == 20
+        assert sum(worker['files'] for worker in report['workers']) == 4
+        assert all(worker['pid'] != os.getpid() for worker in report['workers'])
+
+    def test_parallel_single_file_counts_the_stitched_file(self, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        metrics_file = tmp_path / "metrics.json"
+
+        generators.generate_and_save_data(build_args(output_dir, data_lines=50, multiprocessing=2,
+                                                     metrics_file=str(metrics_file)))
+
+        report = json.loads(metrics_file.read_text())
+        assert report['records'] == 50
+        assert report['files'] == 1
+        assert report['bytes_written'] == output_dir.joinpath("data_1.json").stat().st_size
+
+    def test_stats_logs_summary(self, tmp_path, caplog):
+        with caplog.at_level(logging.INFO):
+            generators.generate_and_save_data(build_args(tmp_path, data_lines=5, stats=True))
+
+        assert "Run metrics: 5 records in 1 files" in caplog.text
+        assert "Run time by stage: generation" in caplog.text
+
+    def test_disabled_by_default(self, tmp_path):
+        generators.generate_and_save_data(build_args(tmp_path))
+
+        assert not metrics.metrics_enabled()
+        assert metrics.take_worker_metrics() is None
+
+    def test_invalid_metrics_file_directory(self, tmp_path):
+        with pytest.raises(SystemExit) as system_info:
+            arguments_validators.validate_metrics_file(str(tmp_path / "missing" / "metrics.json"))
+        assert system_info.value.code == 1
+
+
+class TestProfiling:
+    def test_cpu_profile_report(self, tmp_path, caplog):
+        with caplog.at_level(logging.INFO):
+            generators.generate_and_save_data(build_args(tmp_path, data_lines=50, profile='cpu'))
+
+        assert "Profile merged from 1 processes" in caplog.text
+        assert "generate_and_save_file" in caplog.text
+
+    def test_cpu_profile_includes_pool_workers(self, tmp_path, caplog):
+        with caplog.at_level(logging.INFO):
+            generators.generate_and_save_data(build_args(tmp_path, files_count=4, multiprocessing=2, profile='cpu'))
+
+        # The parent and at least one pool worker contributed to the report.
+        processes = int(re.search(r"Profile merged from (\d+) processes", caplog.text).group(1))
+        assert processes >= 2
+
+    def test_memory_profile_report(self, tmp_path, caplog):
+        with caplog.at_level(logging.INFO):
+            generators.generate_and_save_data(build_args(tmp_path, data_lines=50, profile='memory'))
+
+        assert "Peak traced memory of process" in caplog.text
+        assert "allocation sites at the peak" in caplog.text
+        assert not tracemalloc.is_tracing()
+
+    def test_no_profile_by_default(self, tmp_path, caplog):
+        with caplog.at_level(logging.INFO):
+            generators.generate_and_save_data(build_args(tmp_path))
+
+        assert "Profile merged" not in caplog.text
+        assert profiling.stop_profiling() is None
+
+
+class TestRecordsAPI:
+    SCHEMA = {"id": "str:rand", "age": "int:rand(1, 90)", "type": "str:['client', 'partner']", "kind": "str:fixed"}
+
+    def test_iter_records_yields_lazily(self):
+        records = records_api.iter_records(self.SCHEMA, 5)
+
+        assert not isinstance(records, list)
+        result = list(records)
+        assert len(result) == 5
+        assert all(set(record) == {"id", "age", "type", "kind"} for record in result)
+        assert all(1 <= record["age"] <= 90 and record["kind"] == "fixed" for record in result)
+
+    def test_batches_respect_batch_size(self):
+        batches = list(records_api.iter_record_batches(self.SCHEMA, 25, batch_size=10))
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+
+    def test_seed_is_reproducible(self):
+        first = list(records_api.iter_records(self.SCHEMA, 50, seed=7, batch_size=16))
+        second = list(records_api.iter_records(self.SCHEMA, 50, seed=7, batch_size=16))
+        other = list(records_api.iter_records(self.SCHEMA, 50, seed=8, batch_size=16))
+
+        assert first == second
+        assert first != other
+        assert all(uuid.UUID(record["id"]).version == 4 for record in first)
+
+    def test_accepts_json_schema_string(self):
+        assert list(records_api.iter_records('{"age": "int:7"}', 2)) == [{"age": 7}, {"age": 7}]
+
+    @pytest.mark.parametrize("data_schema, message", [
+        ({"age": "int:rand(10, 1)"}, "Invalid range rand(10, 1) in key 'age'"),
+        ({"age": "int:rand(a, 1)"}, "Invalid format in rand(from, to) at key 'age'"),
+        ({"tags": "str:[1, 2]"}, "All elements in list for key 'tags' must be strings"),
+        ({"age": 5}, "Schema value for key 'age' must be a string"),
+        ({}, "Data schema cannot be empty"),
+        ('{"age": ', "Data schema is not valid JSON"),
+    ])
+    def test_invalid_schema_raises_value_error(self, data_schema, message, caplog):
+        with pytest.raises(ValueError, match=re.escape(message)):
+            records_api.iter_records(data_schema, 1)
+        # A library caller gets the reason in the exception, nothing is logged and nothing exits.
+        assert not caplog.records
+
+    def test_invalid_batch_size_raises_value_error(self):
+        with pytest.raises(ValueError):
+            records_api.iter_record_batches(self.SCHEMA, 1, batch_size=0)
+
+
+class TestServeMode:
+    @pytest.fixture
+    def serve_on_free_port(self, tmp_path):
+        servers = []
+
+        def start(pool=None, **overrides):
+            generator_server = server.GeneratorServer(build_args(tmp_path, **overrides), pool)
+            threading.Thread(target=generator_server.serve_forever, daemon=True).start()
+            servers.append(generator_server)
+            return generator_server.server_address[1]
+
+        yield start
+        for generator_server in servers:
+            generator_server.shutdown()
+            generator_server.server_close()
+
+    @staticmethod
+    def post(port, body):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.request('POST', '/generate', json.dumps(body), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, response.getheader('Transfer-Encoding'), response.read()
+
+    def test_streams_ndjson_for_posted_schema(self, serve_on_free_port):
+        port = serve_on_free_port()
+
+        status, transfer_encoding, body = self.post(port, {'data_schema': {"kind": "str:fixed", "age": "int:3"},
+                                                           'data_lines': 12000})
+
+        assert status == 200
+        assert transfer_encoding == 'chunked'
+        lines = body.decode().splitlines()
+        assert len(lines) == 12000
+        assert json.loads(lines[0]) == {"kind": "fixed", "age": 3}
+
+    def test_uses_default_schema_and_lines(self, serve_on_free_port):
+        port = serve_on_free_port(data_lines=4)
+
+        status, _, body = self.post(port, {})
+
+        assert status == 200
+        assert body.decode().splitlines() == ['{"age":7}'] * 4
+
+    def test_warm_pool_generates_blocks_in_order(self, serve_on_free_port):
+        with multiprocessing.Pool(processes=2) as pool:
+            port = serve_on_free_port(pool, multiprocessing=2)
+            status, _, body = self.post(port, {'data_schema': {"id": "str:rand"}, 'data_lines': 20001})
+
+        assert status == 200
+        assert len(body.splitlines()) == 20001
+
+    @pytest.mark.parametrize("body, message", [
+        ({'data_schema': {"age": "int:rand(5, 1)"}}, "Invalid range rand(5, 1) in key 'age'"),
+        ({'data_schema': {"tags": "int:['a']"}}, "All elements in list for key 'tags' must be ints"),
+        ({'data_lines': 0}, "data_lines must be a positive integer"),
+        ({'data_schema': '{"age": '}, "data_schema is not valid JSON"),
+    ])
+    def test_invalid_request_is_rejected(self, serve_on_free_port, body, message):
+        port = serve_on_free_port()
+
+        status, _, response_body = self.post(port, body)
+
+        assert status == 400
+        assert message in json.loads(response_body)['error']
+
+    @pytest.mark.parametrize("content_length", ['-1', 'abc'])
+    def test_invalid_content_length_is_rejected(self, serve_on_free_port, content_length):
+        port = serve_on_free_port()
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.putrequest('POST', '/generate')
+        connection.putheader('Content-Length', content_length)
+        connection.endheaders()
+
+        response = connection.getresponse()
+
+        assert response.status == 400
+        assert "Content-Length must be a non-negative integer" in json.loads(response.read())['error']
+
+    def test_schema_is_required_without_server_default(self, serve_on_free_port):
+        port = serve_on_free_port(data_schema=None)
+
+        status, _, response_body = self.post(port, {'data_lines': 1})
+
+        assert status == 400
+        assert "data_schema is required" in json.loads(response_body)['error']
+        assert self.post(port, {'data_schema': {"age": "int:1"}, 'data_lines': 1})[0] == 200
+
+    def test_serve_does_not_require_data_schema(self, tmp_path):
+        args = create_parser().parse_args(['--serve', '--path_to_save_files', str(tmp_path)])
+        assert arguments_validators.validate_all_arguments(args)['data_schema'] is None
+
+    @pytest.mark.parametrize("data_schema", [{"x": "str:@file:/etc/passwd"}, '{"x": "str: @file: /etc/passwd"}'])
+    def test_posted_schema_cannot_read_files(self, serve_on_free_port, data_schema):
+        port = serve_on_free_port()
+
+        status, _, response_body = self.post(port, {'data_schema': data_schema, 'data_lines': 1})
+
+        assert status == 400
+        assert "only allowed in the server's own --data_schema" in json.loads(response_body)['error']
+
+    def test_server_schema_follows_edited_value_file(self, serve_on_free_port, tmp_path):
+        values_path = tmp_path.joinpath("values.txt")
+        values_path.write_text("old\n")
+        port = serve_on_free_port(data_schema={"x": f"str:@file:{values_path}"})
+        assert self.post(port, {'data_lines': 2})[2].decode().splitlines() == ['{"x":"old"}'] * 2
+
+        values_path.write_text("newer\n")
+        assert self.post(port, {'data_lines': 2})[2].decode().splitlines() == ['{"x":"newer"}'] * 2
+
+    def test_compiled_schemas_are_cached(self, serve_on_free_port):
+        port = serve_on_free_port()
+        server.compile_cached_schema.cache_clear()
+
+        self.post(port, {'data_schema': {"age": "int:1"}, 'data_lines': 1})
+        self.post(port, {'data_schema': {"age": "int:1"}, 'data_lines': 1})
+
+        assert server.compile_cached_schema.cache_info().misses == 1
+
+
+class TestStdoutStreaming:
+    def test_files_count_zero_streams_ndjson(self, tmp_path, capfd):
+        generators.generate_and_save_data(build_args(tmp_path, files_count=0, data_lines=2500))
+
+        out, _ = capfd.readouterr()
+        lines = out.splitlines()
+        assert len(lines) == 2500
+        assert lines[0] == '{"age":7}'
+        assert list(tmp_path.iterdir()) == []
+
+    def test_captured_stdout_without_descriptor(self, capsys):
+        records_count = file_utils.stream_data_to_stdout([[{"a": 1}], [{"a": 2}]])
+
+        assert records_count == 2
+        assert capsys.readouterr().out == '{"a":1}\n{"a":2}\n'
+
+    def test_closed_pipe_stops_generation(self, tmp_path):
+        # `head -n 1` exits after the first line, the generator must stop without a traceback.
+        command = ("import logging; from capstone.src import generators; logging.basicConfig(level=logging.INFO); "
+                   "generators.generate_and_save_data({'path_to_save_files': '.', 'file_name': 'data', "
+                   "'file_prefix': 'count', 'files_count': 0, 'data_lines': 2000000, "
+                   "'data_schema': {'id': 'str:rand'}, 'clear_path': False, 'multiprocessing': 1, "
+                   "'engine': 'batch', 'output_format': 'json', 'files_per_task': 1, 'pipeline': False, "
+                   "'clear_mode': 'sync', 'compression': 'none', 'archive': 'none', 'stats': False, "
+                   "'metrics_file': '', 'profile': 'none', 'serve': False, 'serve_host': '', 'serve_port': 0, "
+                   "'manifest': None, 'seed': None, 'cache_dir': '', 'cache_size_mb': 1})")
+        result = subprocess.run(f'{sys.executable} -c "{command}" | head -n 1', shell=True, capture_output=True,
+                                text=True, timeout=60, cwd=os.getcwd())
+
+        assert len(result.stdout.splitlines()) == 1
+        assert "Traceback" not in result.stderr
+        assert "Output pipe closed by the reader" in result.stderr
+
+
+class TestManifest:
+    @staticmethod
+    def write_manifest(tmp_path, content, name="manifest.json"):
+        manifest_path = tmp_path / name
+        manifest_path.write_text(content if isinstance(content, str) else json.dumps(content))
+        return str(manifest_path)
+
+    @staticmethod
+    def run(tmp_path, manifest_path, **overrides):
+        run_args = build_args(tmp_path, data_schema=None, manifest=manifest_path, **overrides)
+        jobs = manifest.load_manifest_jobs(run_args, create_parser())
+        generators.generate_manifest_jobs(jobs, run_args)
+        return jobs
+
+    def test_json_manifest_runs_every_job_on_one_pool(self, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        manifest_path = self.write_manifest(tmp_path, {
+            "defaults": {"path_to_save_files": str(output_dir), "file_prefix": "count", "data_lines": 4},
+            "jobs": [{"name": "users", "file_name": "users", "files_count": 3, "data_schema": {"age": "int:7"}},
+                     {"file_name": "events", "files_count": 2, "output_format": "jsonl",
+                      "data_schema": '{"kind": "str:event"}'}]})
+
+        jobs = self.run(tmp_path, manifest_path, multiprocessing=2, files_per_task=2)
+
+        assert [job['file_name'] for job in jobs] == ["users", "events"]
+        assert all(job['multiprocessing'] == 2 for job in jobs)
+        assert sorted(path.name for path in output_dir.iterdir()) == [
+            "events_1.jsonl", "events_2.jsonl", "users_1.json", "users_2.json", "users_3.json"]
+        assert json.loads(output_dir.joinpath("users_3.json").read_text()) == [{"age": 7}] * 4
+        assert output_dir.joinpath("events_2.jsonl").read_text() == '{"kind":"event"}\n' * 4
+
+    def test_ini_manifest_with_shared_defaults(self, tmp_path):
+        output_dir = tmp_path / "output"
+        output_dir.mkdir()
+        manifest_path = self.write_manifest(tmp_path, (
+            f"[DEFAULT]\npath_to_save_files={output_dir}\nfile_prefix=count\ndata_lines=2\npipeline=true\n\n"
+            '[users]\nfile_name=users\ndata_schema={"age": "int:1"}\n\n'
+            '[orders]\nfile_name=orders\nfiles_count=2\ndata_schema={"total": "int:9"}\n'), "manifest.ini")
+
+        jobs = self.run(tmp_path, manifest_path)
+
+        assert all(job['pipeline'] for job in jobs)
+        assert sorted(path.name for path in output_dir.iterdir()) == ["orders_1.json", "orders_2.json", "users_1.json"]
+
+    def test_every_job_is_validated_before_generation(self, tmp_path):
+        manifest_path = self.write_manifest(tmp_path, [
+            {"path_to_save_files": str(tmp_path), "file_name": "good", "data_schema": {"age": "int:7"}},
+            {"path_to_save_files": str(tmp_path), "file_name": "bad", "data_schema": {"age": "int:rand(9, 1)"}}])
+
+        with pytest.raises(SystemExit) as system_info:
+            self.run(tmp_path, manifest_path)
+
+        assert system_info.value.code == 1
+        assert not any(path.name.startswith("good") for path in tmp_path.iterdir())
+
+    @pytest.mark.parametrize("job", [
+        {"file_name": "a", "data_schema": {"age": "int:7"}, "unknown_option": 1},
+        {"file_name": "a", "data_schema": {"age": "int:7"}, "multiprocessing": 4},
+        {"file_name": "a", "data_schema": {"age": "int:7"}, "files_count": 0},
+        {"file_name": "a", "data_schema": {"age": "int:7"}, "output_format": "xml"},
+    ])
+    def test_invalid_job_options(self, tmp_path, job):
+        manifest_path = self.write_manifest(tmp_path, [dict(job, path_to_save_files=str(tmp_path))])
+
+        with pytest.raises(SystemExit):
+            self.run(tmp_path, manifest_path)
+
+    def test_jobs_writing_the_same_files_are_rejected(self, tmp_path):
+        job = {"path_to_save_files": str(tmp_path), "file_name": "same", "data_schema": {"age": "int:7"}}
+        manifest_path = self.write_manifest(tmp_path, [job, job])
+
+        with pytest.raises(SystemExit) as system_info:
+            self.run(tmp_path, manifest_path)
+        assert system_info.value.code == 1
+
+
+class TestStartupTime:
+    # Modules only needed by pools, the server, archives, compression, cleanup or profiling.
+    LAZY_MODULES = {"multiprocessing", "http.server", "tarfile", "zipfile", "gzip", "bz2", "lzma", "cProfile",
+                    "pstats", "tracemalloc", "concurrent.futures", "tempfile"}
+    # The CLI imports in about 30 ms, importing everything eagerly took about 135 ms.
+    IMPORT_TIME_BUDGET_US = 100_000
+
+    @staticmethod
+    def import_times(module):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, timeout=60, cwd=os.getcwd())
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative)
+        return times
+
+    @pytest.mark.parametrize("module", ["capstone.src.magic_generator", "capstone.src.generators"])
+    def test_heavy_modules_are_imported_lazily(self, module):
+        assert self.LAZY_MODULES.isdisjoint(self.import_times(module))
+
+    def test_cli_import_time_budget(self):
+        # The best of a few runs, so a busy machine does not fail the test.
+        best = min(self.import_times("capstone.src.magic_generator")["capstone.src.magic_generator"]
+                   for _ in range(3))
+        assert best < self.IMPORT_TIME_BUDGET_US
+
+    def test_defaults_are_parsed_once(self):
+        first = config_loader.load_defaults_from_config()
+        first['data_lines'] = -1
+
+        assert config_loader.read_defaults_from_config.cache_info().currsize >= 1
+        assert config_loader.load_defaults_from_config()['data_lines'] != -1
+
+    def test_defaults_do_not_depend_on_working_directory(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        assert config_loader.load_defaults_from_config()['file_name'] == 'file_name'